@@ -0,0 +1,49 @@
+from flask import Blueprint, jsonify, request
+from core.execution_log import execution_log
+from core.deadlines import deadlines
+from core.fanout import engine
+from core.dispatch import dispatcher
+from core.coalescing import coalescer
+from core.ssh_service import pool
+from core.upload_cache import upload_cache
+from core.executor import stop_task_everywhere
+from core.launch import recent_start_skew, MAX_REPORTS
+from core.process_executor import sharded_executor
+from config.settings import EXECUTOR_BACKEND
+from core.remote_processes import processes
+
+executions_api_bp = Blueprint("executions_api", __name__)
+
+@executions_api_bp.route("/api/executions/<task_id>")
+def recent_executions(task_id):
+    ip = request.args.get("ip")
+    limit = min(request.args.get("limit", 10, type=int), execution_log.index_depth)
+    return jsonify(execution_log.recent(task_id, ip, limit))
+
+@executions_api_bp.route("/api/executor/stats")
+def executor_stats():
+    return jsonify({
+        "fanout": engine.stats(),
+        "dispatch": dispatcher.stats(),
+        "sessions": coalescer.stats(),
+        "deadlines": deadlines.stats(),
+        "ssh_pool": pool.stats(),
+        "uploads": upload_cache.stats(),
+        "running_processes": processes.count(),
+        "backend": EXECUTOR_BACKEND,
+        **({"workers": sharded_executor.stats()} if EXECUTOR_BACKEND == "processes" else {}),
+    })
+
+@executions_api_bp.route("/api/executor/skew")
+def start_skew():
+    limit = min(request.args.get("limit", 50, type=int), MAX_REPORTS)
+    return jsonify(recent_start_skew(request.args.get("task_id"), limit))
+
+@executions_api_bp.route("/api/tasks/<task_id>/stop", methods=["POST"])
+def stop_task_now(task_id):
+    results = stop_task_everywhere(task_id)
+    return jsonify({
+        "task_id": task_id,
+        "stopped": sum(1 for r in results if r.get("killed")),
+        "hosts": results,
+    })
@@ -0,0 +1,51 @@
+from flask import Blueprint, Response
+from core.metrics import metrics
+from core.deadlines import deadlines
+from core.fanout import engine
+from core.dispatch import dispatcher
+from core.coalescing import coalescer
+from core.ssh_service import pool
+from core.upload_cache import upload_cache
+from core.output_stream import runs
+from core.remote_processes import processes
+
+metrics_api_bp = Blueprint("metrics_api", __name__)
+
+
+def _pool_sessions():
+    hosts = pool.stats()["hosts"].values()
+    return {
+        ("in_use",): sum(host["in_use"] for host in hosts),
+        ("idle",): sum(host["idle"] for host in hosts),
+    }
+
+
+def _pool_events():
+    stats = pool.stats()
+    return {(event,): stats.get(event, 0) for event in ("created", "reused", "failed", "discarded")}
+
+
+metrics.callback("hubiwave_active_runs", "Runs whose output is still streaming.", runs.active)
+metrics.callback("hubiwave_running_processes", "Remote processes launched and not yet finished.", processes.count)
+metrics.callback("hubiwave_fanout_active", "Hosts being worked on by the fan-out engine.", lambda: engine.stats()["active"])
+metrics.callback("hubiwave_fanout_waiting", "Hosts waiting for a fan-out slot.", lambda: engine.stats()["waiting"])
+metrics.callback("hubiwave_dispatch_queue_depth", "Host executions waiting for a session slot.", dispatcher.depth, ("priority",))
+metrics.callback("hubiwave_dispatch_active", "Host executions holding a session slot.", lambda: dispatcher.stats()["active"])
+metrics.callback(
+    "hubiwave_host_sessions_total", "Host sessions started and the executions they carried.",
+    lambda: {("sessions",): coalescer.stats()["sessions"], ("executions",): coalescer.stats()["executions"]},
+    ("kind",), kind="counter",
+)
+metrics.callback("hubiwave_deadlines_pending", "Timeouts waiting to fire.", deadlines.pending)
+metrics.callback("hubiwave_ssh_pool_sessions", "Pooled SSH sessions by state.", _pool_sessions, ("state",))
+metrics.callback("hubiwave_ssh_pool_events_total", "SSH pool connection events.", _pool_events, ("event",), kind="counter")
+metrics.callback(
+    "hubiwave_script_uploads_total", "Script uploads performed and skipped by the content-hash cache.",
+    lambda: {("uploaded",): upload_cache.stats()["uploads"], ("skipped",): upload_cache.stats()["skipped"]},
+    ("result",), kind="counter",
+)
+
+
+@metrics_api_bp.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
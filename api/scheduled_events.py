@@ -1,16 +1,38 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, current_app
 from datetime import datetime
+from collections import OrderedDict
+import hashlib
+import json
+import threading
 from core import scheduler_service as sched
-from core.scheduler_service import (
-    generate_execution_plan,
-    calculate_schedule_metadata
-)
+from core.execution_plan import ExecutionPlan, wave_count
+from core.scheduler_service import calculate_schedule_metadata
+from core.task_store import store
 
 scheduled_api_bp = Blueprint("scheduled_api", __name__)
 
-@scheduled_api_bp.route("/api/scheduled_events")
-def get_scheduled_events():
-    tasks = sched.load_tasks()
+CACHE_SIZE = 64
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def parse_window_bound(value):
+    """Parse a FullCalendar range bound into the naive local time used by task definitions."""
+    if not value:
+        return None
+    value = value.strip().replace(" ", "+")
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def build_events(tasks, window_start=None, window_end=None):
     events = []
 
     for task in tasks:
@@ -32,22 +54,34 @@ def get_scheduled_events():
             task.get("execution_spacing", 0),
             task.get("cycle_every", 0),
             task.get("cycle_unit", "minutes"),
-            task.get("execution_mode", "parallel")
+            task.get("execution_mode", "parallel"),
+            waves=wave_count(task)
         ) or {}
 
-        raw_plan = generate_execution_plan(task)
-        flat_plan = [e for e in raw_plan]
+        event_end = end_event or meta.get("estimated_end")
+        try:
+            if window_end and datetime.fromisoformat(start) >= window_end:
+                continue
+            if window_start and event_end and datetime.fromisoformat(event_end) < window_start:
+                continue
+            plan = ExecutionPlan(task)
+        except (ValueError, KeyError) as e:
+            print(f"⚠️ Skipping task {task.get('id')} in calendar: {e}")
+            continue
 
         events.append({
             "id": task.get("id"),
             "title": task.get("name", "Unnamed"),
             "start": start,
-            "end": end_event or meta.get("estimated_end"),
+            "end": event_end,
             "extendedProps": {
                 "description": task.get("description"),
                 "execution_mode": task.get("execution_mode"),
                 "total_cycles": task.get("total_cycles"),
                 "executions_per_cycle": task.get("executions_per_cycle"),
+                "wave_size": task.get("wave_size"),
+                "waves": len(plan.waves) if plan.mode == "rolling" else None,
+                "wave_failure_threshold": task.get("wave_failure_threshold"),
                 "timeout": meta.get("timeout"),
                 "cycle_duration": meta.get("cycle_duration"),
                 "total_duration": meta.get("total_duration"),
@@ -57,8 +91,43 @@ def get_scheduled_events():
                 "type": task.get("type"),
                 "macs": task.get("macs", {}),
                 "machines": task.get("machines", []),
-                "execution_plan": flat_plan
+                "total_executions": len(plan),
+                "execution_plan": list(plan.between(window_start, window_end))
             }
         })
 
-    return jsonify(events)
+    return events
+
+
+def cached_events_payload(window_start, window_end):
+    version = store.current_version()
+    key = (version, window_start, window_end)
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    body = json.dumps(build_events(sched.load_tasks(), window_start, window_end)).encode()
+    etag = hashlib.sha1(body).hexdigest()
+
+    with _cache_lock:
+        for stale in [k for k in _cache if k[0] != version]:
+            del _cache[stale]
+        _cache[key] = (body, etag)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return body, etag
+
+
+@scheduled_api_bp.route("/api/scheduled_events")
+def get_scheduled_events():
+    window_start = parse_window_bound(request.args.get("start"))
+    window_end = parse_window_bound(request.args.get("end"))
+
+    body, etag = cached_events_payload(window_start, window_end)
+
+    response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
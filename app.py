@@ -3,17 +3,21 @@ from modules.hosts.routes import hosts_bp
 from modules.scheduler import scheduler_bp
 from modules.scripts import scripts_bp
 from modules.calendar import calendar_bp
+from modules.runs import runs_bp
 
 from core.scheduler_service import start_scheduler
-from core.executor import run_task
+from core.executor import dispatch_task
 from core.utils import load_hosts
 from core.file_watcher import start_file_watcher
+from core.host_health import prober
 
 from pathlib import Path
 import os
 import logging
 
 from api.scheduled_events import scheduled_api_bp
+from api.executions import executions_api_bp
+from api.metrics import metrics_api_bp
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,7 +32,10 @@ def create_app():
     app.register_blueprint(scheduler_bp)
     app.register_blueprint(scripts_bp)
     app.register_blueprint(calendar_bp)
+    app.register_blueprint(runs_bp)
     app.register_blueprint(scheduled_api_bp)
+    app.register_blueprint(executions_api_bp)
+    app.register_blueprint(metrics_api_bp)
 
     @app.route("/")
     def index():
@@ -46,8 +53,9 @@ if __name__ == "__main__":
 
     app = create_app()
 
-    hosts = load_hosts()
-    scheduler = start_scheduler(run_task, hosts)
-    start_file_watcher(scheduler, run_task)
+    scheduler = start_scheduler(dispatch_task)
+    start_file_watcher(scheduler, dispatch_task)
+    prober.track(load_hosts())
+    prober.start()
 
     app.run(debug=False, use_reloader=False)
@@ -0,0 +1,214 @@
+"""
+Executor benchmark: run_task, run_cycle and POST /scripts/run against a fleet of fake SSH hosts.
+
+Starts N in-process fake hosts (benchmarks/fake_fleet.py) on loopback addresses, registers them
+in a throwaway workspace's hosts.json and drives each execution path at every fleet size.
+Reports throughput, p50/p99 dispatch-to-exit latency, peak threads and peak RSS, and writes the
+results as JSON so runs can be compared across versions.
+
+    python benchmarks/executor.py --sizes 10,100,500 --output results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import paramiko
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fake_fleet import FakeFleet  # noqa: E402
+
+SCRIPT_NAME = "bench.sh"
+
+
+def current_rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+class Sampler:
+    """Samples thread count and RSS in the background while a scenario runs."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_rss = max(self.peak_rss, current_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def run_scenario(name, fleet, ips, drive):
+    fleet.reset()
+    baseline_threads = threading.active_count()
+    with Sampler() as sampler, contextlib.redirect_stdout(io.StringIO()):
+        dispatched = time.time()
+        results = drive(ips)
+        wall = time.time() - dispatched
+
+    latencies = [exits[0] - dispatched for exits in fleet.exits.values() if exits]
+    statuses = {}
+    for result in results:
+        status = result.get("status", "error") if isinstance(result, dict) else "error"
+        statuses[status] = statuses.get(status, 0) + 1
+
+    return {
+        "scenario": name,
+        "hosts": len(ips),
+        "seconds": round(wall, 3),
+        "throughput_hosts_per_s": round(len(ips) / wall, 2) if wall else None,
+        "latency_p50_s": round(percentile(latencies, 0.50), 4) if latencies else None,
+        "latency_p99_s": round(percentile(latencies, 0.99), 4) if latencies else None,
+        "completed": len(latencies),
+        "statuses": statuses,
+        "baseline_threads": baseline_threads,
+        "peak_threads": sampler.peak_threads,
+        "peak_rss_mb": round(sampler.peak_rss / 2 ** 20, 1),
+    }
+
+
+def run_benchmarks(args, sizes, scenarios, workspace):
+    for directory in ("modules/hosts/data", "modules/scheduler/data", "modules/scripts/scripts_drive", "logs"):
+        os.makedirs(os.path.join(workspace, directory), exist_ok=True)
+    with open(os.path.join(workspace, "modules/scripts/scripts_drive", SCRIPT_NAME), "w") as f:
+        f.write("#!/bin/bash\necho benchmark\n")
+    with open(os.path.join(workspace, "modules/scheduler/data/scheduled_events.json"), "w") as f:
+        f.write("[]")
+    # A throwaway key, so the benchmark neither needs nor touches the user's ~/.ssh (the fake hosts accept any key).
+    key_path = os.path.join(workspace, "id_rsa")
+    key = paramiko.RSAKey.generate(2048)
+    key.write_private_key_file(key_path)
+    with open(key_path + ".pub", "w") as f:
+        f.write(f"{key.get_name()} {key.get_base64()} hubiwave-bench\n")
+    # Read by config.settings, which is first imported below.
+    os.environ["HUBIWAVE_SSH_KEY"] = key_path
+    # Stores, registries and script paths resolve relative to the working directory.
+    os.chdir(workspace)
+    logging.disable(logging.WARNING)
+
+    fleet = FakeFleet(max(sizes), port=args.port, command_seconds=args.command_seconds).start()
+    try:
+        with open("modules/hosts/data/hosts.json", "w") as f:
+            json.dump(fleet.host_entries(), f)
+
+        from app import create_app
+        from core.executor import run_task, run_cycle
+        from core.execution_log import execution_log
+        from core.output_stream import runs
+        from config.settings import SCHEDULER_THREADS
+
+        client = create_app().test_client()
+        task = {"id": "bench-task", "name": "bench", "type": "command", "command": "true", "timeout": 60}
+
+        def drive_run_task(ips):
+            # Scheduled run_task jobs fire on the scheduler's thread pool, sized like this one.
+            with ThreadPoolExecutor(max_workers=SCHEDULER_THREADS) as workers:
+                return list(workers.map(lambda ip: run_task(task, ip), ips))
+
+        def drive_run_cycle(ips):
+            return list(run_cycle(task, ips, 1).values())
+
+        def drive_scripts_run(ips):
+            response = client.post(f"/scripts/run/{SCRIPT_NAME}", data={"target_ips": ips})
+            if response.status_code >= 400:
+                return [{"status": f"http_{response.status_code}"}] * len(ips)
+            # The route starts the run in the background and redirects to it; wait for it to finish.
+            run = runs.get(response.headers["Location"].rstrip("/").rsplit("/", 1)[-1])
+            run.wait()
+            return list(run.summary()["hosts"].values())
+
+        drivers = {"run_task": drive_run_task, "run_cycle": drive_run_cycle, "scripts_run": drive_scripts_run}
+
+        results = []
+        for size in sizes:
+            ips = fleet.ips[:size]
+            for name in scenarios:
+                result = run_scenario(name, fleet, ips, drivers[name])
+                results.append(result)
+                print(f"{name:>12} @ {size:>4} hosts: {result['throughput_hosts_per_s']} hosts/s, "
+                      f"p50 {result['latency_p50_s']}s, p99 {result['latency_p99_s']}s, "
+                      f"{result['peak_threads']} threads, {result['peak_rss_mb']} MB", file=sys.stderr)
+
+        execution_log.flush()
+        return results
+    finally:
+        fleet.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,500", help="comma-separated fleet sizes")
+    parser.add_argument("--scenarios", default="run_task,run_cycle,scripts_run")
+    parser.add_argument("--command-seconds", type=float, default=0.05, help="simulated remote run time")
+    parser.add_argument("--port", type=int, default=2222)
+    parser.add_argument("--output", help="write the JSON report to this file as well")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    scenarios = args.scenarios.split(",")
+
+    # The workspace (hosts, logs, uploaded scripts) is removed once the benchmark is over.
+    with tempfile.TemporaryDirectory(prefix="hubiwave-bench-") as workspace:
+        try:
+            results = run_benchmarks(args, sizes, scenarios, workspace)
+        finally:
+            os.chdir(REPO_ROOT)
+
+    from config.settings import MAX_CONCURRENCY, EXECUTOR_BACKEND, SCHEDULER_THREADS
+    from config.version import APP_VERSION
+
+    report = {
+        "benchmark": "executor",
+        "app_version": APP_VERSION,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "max_concurrency": MAX_CONCURRENCY,
+            "executor_backend": EXECUTOR_BACKEND,
+            "command_seconds": args.command_seconds,
+            "scheduler_threads": SCHEDULER_THREADS,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(os.path.join(REPO_ROOT, args.output) if not os.path.isabs(args.output) else args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+In-process fleet of fake SSH hosts for benchmarks.
+
+Every host is a paramiko ServerInterface listening on its own loopback address (127.0.x.y) so
+hosts.json can keep one entry per IP. Commands are not executed: each exec request answers
+after a configurable delay with a line of output and exit status 0, which is what the
+executor's wrappers expect. Uploads go to an in-memory SFTP server, and the upload cache's
+sha256sum probe is answered from those files, so the skip path behaves like a real host.
+"""
+import hashlib
+import io
+import os
+import selectors
+import shlex
+import socket
+import threading
+import time
+
+import paramiko
+from paramiko import SFTPAttributes, SFTPHandle, SFTPServer, SFTPServerInterface, SFTP_OK, SFTP_NO_SUCH_FILE
+
+HOST_KEY = paramiko.RSAKey.generate(2048)
+CLOSE_GRACE_SECONDS = 1.0
+
+
+def fleet_address(index):
+    """Loopback address of host number index (0-based), skipping .0 and .255."""
+    return f"127.0.{1 + index // 254}.{1 + index % 254}"
+
+
+class _MemoryHandle(SFTPHandle):
+    def __init__(self, host, path, flags):
+        super().__init__(flags)
+        self.host = host
+        self.path = path
+        self.buffer = io.BytesIO(b"" if flags & os.O_TRUNC else host.files.get(path, b""))
+
+    def write(self, offset, data):
+        self.buffer.seek(offset)
+        self.buffer.write(data)
+        return SFTP_OK
+
+    def read(self, offset, length):
+        self.buffer.seek(offset)
+        return self.buffer.read(length)
+
+    def stat(self):
+        attrs = SFTPAttributes()
+        attrs.st_size = len(self.buffer.getvalue())
+        attrs.st_mode = 0o100644
+        return attrs
+
+    def chattr(self, attr):
+        return SFTP_OK
+
+    def close(self):
+        self.host.files[self.path] = self.buffer.getvalue()
+        return super().close()
+
+
+def _memory_sftp(host):
+    class MemorySFTP(SFTPServerInterface):
+        def open(self, path, flags, attr):
+            return _MemoryHandle(host, path, flags)
+
+        def stat(self, path):
+            if path not in host.files:
+                return SFTP_NO_SUCH_FILE
+            attrs = SFTPAttributes()
+            attrs.st_size = len(host.files[path])
+            attrs.st_mode = 0o100755
+            return attrs
+
+        lstat = stat
+
+        def chattr(self, path, attr):
+            return SFTP_OK
+
+        def remove(self, path):
+            host.files.pop(path, None)
+            return SFTP_OK
+
+    return MemorySFTP
+
+
+class FakeHost(paramiko.ServerInterface):
+    def __init__(self, fleet, ip):
+        self.fleet = fleet
+        self.ip = ip
+        self.files = {}
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "publickey,password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        command = command.decode(errors="replace")
+        if "sha256sum" in command:
+            path = shlex.split(command)[-1]
+            data = self.files.get(path)
+            output = f"{hashlib.sha256(data).hexdigest()}  {path}\n" if data is not None else ""
+            threading.Thread(target=self._reply, args=(channel, output, 0 if output else 1, 0), daemon=True).start()
+        else:
+            self.fleet.commands += 1
+            threading.Thread(target=self._reply, args=(channel, "ok\n", 0, self.fleet.command_seconds, True), daemon=True).start()
+        return True
+
+    def _reply(self, channel, output, status, delay, record=False):
+        time.sleep(delay)
+        try:
+            channel.sendall(output.encode())
+            if record:
+                self.fleet.record_exit(self.ip)
+            channel.send_exit_status(status)
+            # EOF rather than close: the transport acknowledges the exec request only after
+            # check_channel_exec_request returns, and a close arriving first fails the client.
+            channel.shutdown_write()
+            time.sleep(CLOSE_GRACE_SECONDS)
+        finally:
+            channel.close()
+
+
+class FakeFleet:
+    """Starts count fake hosts on consecutive loopback addresses, all accepting on one selector thread."""
+
+    def __init__(self, count, port=2222, command_seconds=0.05):
+        self.count = count
+        self.port = port
+        self.command_seconds = command_seconds
+        self.ips = [fleet_address(i) for i in range(count)]
+        self.hosts = {}
+        self.commands = 0
+        self.exits = {}
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._sockets = []
+        self._running = False
+
+    def start(self):
+        for ip in self.ips:
+            sock = socket.socket()
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((ip, self.port))
+            sock.listen(128)
+            sock.setblocking(False)
+            self.hosts[ip] = FakeHost(self, ip)
+            self._selector.register(sock, selectors.EVENT_READ, ip)
+            self._sockets.append(sock)
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True, name="fake-fleet").start()
+        return self
+
+    def _accept_loop(self):
+        while self._running:
+            for key, _ in self._selector.select(timeout=0.5):
+                try:
+                    conn, _ = key.fileobj.accept()
+                except BlockingIOError:
+                    continue
+                conn.setblocking(True)
+                self._serve(conn, self.hosts[key.data])
+
+    @staticmethod
+    def _serve(conn, host):
+        transport = paramiko.Transport(conn)
+        transport.add_server_key(HOST_KEY)
+        transport.set_subsystem_handler("sftp", SFTPServer, _memory_sftp(host))
+        try:
+            transport.start_server(event=threading.Event(), server=host)
+        except Exception:
+            transport.close()
+
+    def record_exit(self, ip):
+        with self._lock:
+            self.exits.setdefault(ip, []).append(time.time())
+
+    def reset(self):
+        with self._lock:
+            self.exits = {}
+            self.commands = 0
+
+    def host_entries(self, user="bench"):
+        return [
+            {"id": f"02:00:00:{i // 65536 % 256:02x}:{i // 256 % 256:02x}:{i % 256:02x}", "ip": ip, "user": user, "port": self.port}
+            for i, ip in enumerate(self.ips)
+        ]
+
+    def stop(self):
+        self._running = False
+        for sock in self._sockets:
+            self._selector.unregister(sock)
+            sock.close()
@@ -0,0 +1,119 @@
+"""
+Scheduler startup benchmark: cold start (empty jobstore) vs warm start (persisted jobstore).
+
+Builds a throwaway workspace with a large hosts.json and scheduled_events.json, then times
+start_scheduler() in both situations and prints the results as JSON.
+
+    python benchmarks/startup.py --tasks 2000 --hosts 200 --repeat 3
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def noop(*args, **kwargs):
+    pass
+
+
+def write_workspace(root, task_count, host_count, machines_per_task, seed=0):
+    rng = random.Random(seed)
+    hosts = [
+        {"ip": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", "id": f"02:00:00:{i // 65536 % 256:02x}:{i // 256 % 256:02x}:{i % 256:02x}", "user": "pi", "port": 22}
+        for i in range(1, host_count + 1)
+    ]
+    start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    tasks = []
+    for i in range(task_count):
+        machines = rng.sample(hosts, min(machines_per_task, len(hosts)))
+        tasks.append({
+            "id": f"bench-{i:06d}",
+            "name": f"bench {i}",
+            "start_datetime": (start + timedelta(minutes=rng.randint(0, 10000))).isoformat(),
+            "total_cycles": rng.randint(1, 50),
+            "cycle_every": rng.randint(1, 30),
+            "cycle_unit": "minutes",
+            "execution_mode": rng.choice(["parallel", "sequential"]),
+            "executions_per_cycle": rng.randint(1, 5),
+            "execution_spacing": rng.randint(0, 10),
+            "timeout": rng.randint(5, 60),
+            "type": "command",
+            "command": "true",
+            "machines": [host["ip"] for host in machines],
+            "macs": {host["ip"]: host["id"] for host in machines},
+            "active": True,
+        })
+
+    os.makedirs(os.path.join(root, "modules/hosts/data"), exist_ok=True)
+    os.makedirs(os.path.join(root, "modules/scheduler/data"), exist_ok=True)
+    with open(os.path.join(root, "modules/hosts/data/hosts.json"), "w") as f:
+        json.dump(hosts, f)
+    with open(os.path.join(root, "modules/scheduler/data/scheduled_events.json"), "w") as f:
+        json.dump(tasks, f)
+
+
+def timed_start(scheduler_service, jobstore_path):
+    started = time.perf_counter()
+    scheduler = scheduler_service.start_scheduler(noop, jobstore_path=jobstore_path)
+    ready = time.perf_counter() - started
+    scheduler_service.wait_until_validated(scheduler)
+    validated = time.perf_counter() - started
+    jobs = len(scheduler.get_jobs())
+    scheduler.shutdown(wait=False)
+    return {"ready_seconds": round(ready, 4), "validated_seconds": round(validated, 4), "jobs": jobs}
+
+
+def summarize(samples):
+    return {
+        key: round(statistics.median(sample[key] for sample in samples), 4)
+        for key in ("ready_seconds", "validated_seconds", "jobs")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--hosts", type=int, default=200)
+    parser.add_argument("--machines-per-task", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workspace = tempfile.mkdtemp(prefix="hubiwave-bench-")
+    write_workspace(workspace, args.tasks, args.hosts, args.machines_per_task)
+    # Stores and registries resolve their files relative to the working directory.
+    os.chdir(workspace)
+    sys.path.insert(0, REPO_ROOT)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from core import scheduler_service
+
+        cold, warm = [], []
+        for i in range(args.repeat):
+            jobstore_path = os.path.join(workspace, f"jobs-{i}.db")
+            cold.append(timed_start(scheduler_service, jobstore_path))
+            scheduler_service._scheduled_fingerprints.clear()
+            warm.append(timed_start(scheduler_service, jobstore_path))
+            scheduler_service._scheduled_fingerprints.clear()
+
+    print(json.dumps({
+        "tasks": args.tasks,
+        "hosts": args.hosts,
+        "machines_per_task": args.machines_per_task,
+        "repeat": args.repeat,
+        "cold": summarize(cold),
+        "warm": summarize(warm),
+        "workspace": workspace,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+
+# Maximum number of hosts the executor works on at the same time.
+MAX_CONCURRENCY = int(os.environ.get("HUBIWAVE_MAX_CONCURRENCY", "32"))
+# Private key used to authenticate to hosts (its .pub is what enrollment installs).
+SSH_KEY_PATH = os.path.expanduser(os.environ.get("HUBIWAVE_SSH_KEY", "~/.ssh/id_rsa"))
+# Most SSH connections kept open by the pool (leased and idle); idle ones are closed to make room.
+SSH_POOL_MAX_CONNECTIONS = int(os.environ.get("HUBIWAVE_SSH_POOL_MAX", "256"))
+
+# Admission control for executions: SSH sessions running at once overall and on any single host.
+DISPATCH_MAX_SESSIONS = int(os.environ.get("HUBIWAVE_DISPATCH_MAX_SESSIONS", str(MAX_CONCURRENCY)))
+DISPATCH_MAX_PER_HOST = int(os.environ.get("HUBIWAVE_DISPATCH_MAX_PER_HOST", "2"))
+# Scheduled executions reaching the same host within this many seconds share one SSH session
+# (executions queued behind a busy host share it regardless).
+SESSION_COALESCE_WINDOW = float(os.environ.get("HUBIWAVE_SESSION_WINDOW", "0.05"))
+
+# Where scheduled tasks live: "json" (scheduled_events.json) or "sqlite" (WAL database).
+TASK_STORE_BACKEND = os.environ.get("HUBIWAVE_TASK_STORE", "json")
+TASK_DB_PATH = os.environ.get("HUBIWAVE_TASK_DB", "modules/scheduler/data/scheduled_events.db")
+
+# APScheduler jobs survive restarts in this SQLite file; set it empty to keep jobs in memory only.
+JOBSTORE_DB_PATH = os.environ.get("HUBIWAVE_JOBSTORE_DB", "modules/scheduler/data/jobs.db")
+# Seconds a missed fire (e.g. while the app was down) may still run late; older fires are skipped.
+SCHEDULER_MISFIRE_GRACE = int(os.environ.get("HUBIWAVE_MISFIRE_GRACE", "30"))
+# Collapse several missed fires of one job into a single run instead of replaying each of them.
+SCHEDULER_COALESCE = os.environ.get("HUBIWAVE_COALESCE", "1") not in ("0", "false", "no")
+# Threads running scheduled jobs; sequential tasks need one per host for their hosts to launch together.
+SCHEDULER_THREADS = int(os.environ.get("HUBIWAVE_SCHEDULER_THREADS", str(MAX_CONCURRENCY)))
+# Seconds before each planned fire at which connections to its hosts are opened and authenticated (0 disables it).
+PREWARM_LEAD_SECONDS = float(os.environ.get("HUBIWAVE_PREWARM_LEAD", "10"))
+# The hosts of one scheduled fire wait up to this long for each other, then launch together (0: no barrier).
+LAUNCH_BARRIER_SECONDS = float(os.environ.get("HUBIWAVE_LAUNCH_BARRIER", "3"))
+
+# Hosts probed at the same time by subnet discovery, and the most addresses one discovery may cover.
+DISCOVERY_CONCURRENCY = int(os.environ.get("HUBIWAVE_DISCOVERY_CONCURRENCY", "64"))
+DISCOVERY_MAX_TARGETS = int(os.environ.get("HUBIWAVE_DISCOVERY_MAX_TARGETS", "4096"))
+# Hosts enrolled at the same time; enrollment has its own pool so it never takes slots from running tasks.
+ENROLL_CONCURRENCY = int(os.environ.get("HUBIWAVE_ENROLL_CONCURRENCY", "32"))
+
+# Where hosts are executed: "threads" (inside this process) or "processes" (sharded over worker processes).
+EXECUTOR_BACKEND = os.environ.get("HUBIWAVE_EXECUTOR", "threads")
+EXECUTOR_WORKERS = int(os.environ.get("HUBIWAVE_EXECUTOR_WORKERS", str(os.cpu_count() or 1)))
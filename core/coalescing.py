@@ -0,0 +1,206 @@
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from config.settings import SESSION_COALESCE_WINDOW
+from core.deadlines import deadlines
+from core.dispatch import dispatcher, MANUAL, SCHEDULED
+from core.ssh_service import pool, test_ssh_connection
+
+PRECHECK_SECONDS = 3
+
+
+class HostSession:
+    """
+    One SSH session shared by the executions coalesced on a host.
+
+    Whichever member gets there first runs the reachability check and takes a pooled connection;
+    the SFTP channel is opened once and shared too. Each member then runs its command on its own
+    channel of the same transport. The connection goes back to the pool, and the dispatch ticket
+    (which counts every member against the host's cap) is released, when the last member is done.
+    """
+
+    def __init__(self, ip, coalescer=None):
+        self.ip = ip
+        self.members = 0
+        self.size = 0
+        self.started = Future()
+        self.reachable = None
+        self.client = None
+        self.error = None
+        self.phases = {}
+        self._coalescer = coalescer
+        self._ticket = None
+        self._window_over = False
+        self._lock = threading.Lock()
+        self._opened = False
+        self._sftp = None
+        self._user = None
+        self._port = None
+        self._discard = False
+
+    def open(self, user, port):
+        """Check reachability and connect, once for all members; the outcome is left on the session."""
+        with self._lock:
+            if self._opened:
+                return
+            self._opened = True
+            self._user, self._port = user, port
+
+            started = time.time()
+            deadline = started + PRECHECK_SECONDS
+            while time.time() < deadline:
+                if test_ssh_connection(self.ip, user, port, retries=1, delay=0):
+                    self.reachable = True
+                    break
+                time.sleep(0.2)
+            else:
+                self.reachable = False
+            self.phases["precheck"] = (started, time.time())
+            if not self.reachable:
+                return
+
+            started = time.time()
+            try:
+                self.client = pool.acquire(self.ip, user, port)
+            except Exception as e:
+                self.error = e
+            self.phases["connect"] = (started, time.time())
+
+    @contextmanager
+    def sftp(self):
+        """The session's SFTP channel, held by one member at a time."""
+        with self._lock:
+            if self._sftp is None:
+                self._sftp = self.client.open_sftp()
+            yield self._sftp
+
+    def discard(self):
+        """Don't hand the connection back to the pool (a member hit an error on it)."""
+        self._discard = True
+
+    def _join(self):
+        self.members += 1
+        self.size += 1
+        return SessionTicket(self)
+
+    def _admit(self, window):
+        if window > 0:
+            deadlines.schedule(window, self._close_window)
+        else:
+            self._window_over = True
+        self._ticket.granted.add_done_callback(lambda _: self._maybe_start())
+
+    def _close_window(self):
+        if self._window_over:
+            return
+        self._window_over = True
+        self._maybe_start()
+
+    def _maybe_start(self):
+        # Starts once admitted and the join window is over; until then more work for the host may join.
+        with self._coalescer._lock:
+            if self.started.done() or not self._window_over or not self._ticket.granted.done():
+                return
+            if self._coalescer._open.get(self.ip) is self:
+                del self._coalescer._open[self.ip]
+            self._coalescer._record(self.size)
+        self.started.set_result(self)
+
+    def _leave(self, ticket):
+        lock = self._coalescer._lock if self._coalescer else self._lock
+        with lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self.members -= 1
+            last = self.members == 0
+        if last:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._sftp is not None:
+                try:
+                    self._sftp.close()
+                except Exception:
+                    pass
+                self._sftp = None
+            if self.client is not None:
+                pool.release(self.client, self.ip, self._user, self._port, discard=self._discard)
+                self.client = None
+        if self._ticket is not None:
+            self._ticket.release()
+
+
+class SessionTicket:
+    """A member's place in a HostSession, with the granted/release interface of a dispatch ticket."""
+
+    def __init__(self, session):
+        self.session = session
+        self.granted = session.started
+        self.released = False
+
+    def wait(self):
+        self.granted.result()
+        return self
+
+    def release(self):
+        self.session._leave(self)
+
+
+class SessionCoalescer:
+    """
+    Merges executions that target the same host within window seconds into one HostSession.
+
+    A session keeps accepting members until its window is over and it has been admitted, so work
+    queued behind a busy host merges too, but each member counts against the host's dispatch
+    cap: once the session can't take one more, the next request opens a new session. A manual run
+    ends the window and lifts the session to manual priority, whoever opened it.
+    """
+
+    def __init__(self, window=SESSION_COALESCE_WINDOW, queue=dispatcher):
+        self.window = window
+        self.queue = queue
+        # Reentrant: granting a session's ticket may start it (and take this lock) on the requesting thread.
+        self._lock = threading.RLock()
+        self._open = {}
+        self._stats = {"sessions": 0, "executions": 0, "coalesced": 0, "largest": 0}
+
+    def request(self, ip, priority=SCHEDULED):
+        """Join (or open) the host's pending session; the ticket's granted future resolves when it starts."""
+        with self._lock:
+            session = self._open.get(ip)
+            opened = session is None or not self.queue.join(session._ticket, priority)
+            if opened:
+                session = self._open[ip] = HostSession(ip, self)
+                session._ticket = self.queue.request(ip, priority)
+            ticket = session._join()
+        if opened:
+            session._admit(0 if priority == MANUAL else self.window)
+        elif priority == MANUAL:
+            session._close_window()
+        return ticket
+
+    @contextmanager
+    def slot(self, ip, priority=SCHEDULED):
+        ticket = self.request(ip, priority).wait()
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _record(self, size):
+        self._stats["sessions"] += 1
+        self._stats["executions"] += size
+        if size > 1:
+            self._stats["coalesced"] += size
+        self._stats["largest"] = max(self._stats["largest"], size)
+
+    def stats(self):
+        with self._lock:
+            return {"window": self.window, "pending": len(self._open), **self._stats}
+
+
+coalescer = SessionCoalescer()
@@ -0,0 +1,103 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Deadline:
+    def __init__(self, when, callback, args, supervisor):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.fired = False
+        self._supervisor = supervisor
+
+    def cancel(self):
+        """Drop the deadline; returns False if it already fired."""
+        return self._supervisor._cancel(self)
+
+
+class DeadlineSupervisor:
+    """One thread watching a heap of deadlines instead of one sleeping thread per timeout."""
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._cond = threading.Condition()
+        self._heap = []
+        self._counter = itertools.count()
+        self._pending = 0
+        self._cancelled_in_heap = 0
+        self._fired = 0
+        self._thread = None
+        self._workers = None
+
+    def schedule(self, delay, callback, *args):
+        deadline = Deadline(time.monotonic() + delay, callback, args, self)
+        with self._cond:
+            self._ensure_started()
+            heapq.heappush(self._heap, (deadline.when, next(self._counter), deadline))
+            self._pending += 1
+            if self._heap[0][2] is deadline:
+                self._cond.notify()
+        return deadline
+
+    def _cancel(self, deadline):
+        with self._cond:
+            if deadline.fired or deadline.cancelled:
+                return False
+            deadline.cancelled = True
+            self._pending -= 1
+            self._cancelled_in_heap += 1
+            if self._cancelled_in_heap > 64 and self._cancelled_in_heap > len(self._heap) // 2:
+                self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled_in_heap = 0
+            return True
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._workers = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="deadline")
+            self._thread = threading.Thread(target=self._run, daemon=True, name="deadline-supervisor")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                        self._cancelled_in_heap -= 1
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+
+                _, _, deadline = heapq.heappop(self._heap)
+                deadline.fired = True
+                self._pending -= 1
+                self._fired += 1
+
+            self._workers.submit(self._fire, deadline)
+
+    @staticmethod
+    def _fire(deadline):
+        try:
+            deadline.callback(*deadline.args)
+        except Exception as e:
+            print(f"❌ [Deadlines] Callback failed: {e}")
+
+    def pending(self):
+        with self._cond:
+            return self._pending
+
+    def stats(self):
+        with self._cond:
+            return {"pending": self._pending, "fired": self._fired, "heap_size": len(self._heap)}
+
+
+deadlines = DeadlineSupervisor()
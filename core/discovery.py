@@ -0,0 +1,204 @@
+import ipaddress
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from config.settings import DISCOVERY_CONCURRENCY, DISCOVERY_MAX_TARGETS
+from core.fanout import FanoutEngine
+from core.host_registry import registry
+from core.ssh_service import KEY_PATH, get_host_facts
+
+PENDING_FILE = "modules/hosts/data/pending_hosts.json"
+MAX_JOBS = 20
+
+pending_lock = threading.Lock()
+
+
+def expand_targets(targets, max_targets=DISCOVERY_MAX_TARGETS):
+    """
+    Turn CIDR ranges, single addresses and a.b.c.d-e ranges into a de-duplicated list of IPs.
+
+    :param targets: a list of entries, or one string with entries separated by commas, spaces or new lines
+    """
+    if isinstance(targets, str):
+        targets = targets.replace(",", " ").split()
+
+    ips = OrderedDict()
+    for entry in targets:
+        entry = entry.strip()
+        if not entry:
+            continue
+        if "/" in entry:
+            network = ipaddress.ip_network(entry, strict=False)
+            addresses = network.hosts() if network.num_addresses > 2 else network
+        elif "-" in entry:
+            first, _, last = entry.partition("-")
+            first = ipaddress.ip_address(first)
+            last = ipaddress.ip_address(last) if "." in last or ":" in last else ipaddress.ip_address(
+                str(first).rsplit(".", 1)[0] + "." + last
+            )
+            if last < first:
+                raise ValueError(f"Empty address range: {entry}")
+            addresses = (first + offset for offset in range(int(last) - int(first) + 1))
+        else:
+            addresses = [ipaddress.ip_address(entry)]
+
+        for address in addresses:
+            ips[str(address)] = None
+            if len(ips) > max_targets:
+                raise ValueError(f"Discovery is limited to {max_targets} addresses")
+    return list(ips)
+
+
+def port_open(ip, port, timeout):
+    try:
+        with socket.create_connection((ip, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def add_pending_host(host):
+    """Append host to pending_hosts.json unless its MAC is already known; returns "added" or "exists"."""
+    with pending_lock:
+        if registry.by_mac(host["id"]):
+            return "exists"
+        try:
+            with open(PENDING_FILE) as f:
+                pending = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pending = []
+        if any(h.get("id") == host["id"] for h in pending):
+            return "exists"
+
+        pending.append(host)
+        directory = os.path.dirname(PENDING_FILE)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".pending_hosts.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(pending, f, indent=2)
+            os.replace(tmp_path, PENDING_FILE)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return "added"
+
+
+class DiscoveryJob:
+    """One bulk discovery: port probe, facts collection and pending_hosts.json updates, with progress."""
+
+    def __init__(self, job_id, ips, user, port, key_path, timeout):
+        self.job_id = job_id
+        self.ips = ips
+        self.user = user
+        self.port = port
+        self.key_path = key_path
+        self.timeout = timeout
+        self.started_at = time.time()
+        self.finished_at = None
+        self.counts = {"probed": 0, "open": 0, "added": 0, "exists": 0, "failed": 0}
+        self.events = []
+        self._lock = threading.Lock()
+
+    def _record(self, ip, status, **details):
+        with self._lock:
+            self.counts["probed"] += 1
+            if status != "closed":
+                self.counts["open"] += 1
+            if status in self.counts:
+                self.counts[status] += 1
+            self.events.append({"seq": len(self.events) + 1, "ip": ip, "status": status, "ts": time.time(), **details})
+
+    def discover(self, ip):
+        started = time.time()
+        if not port_open(ip, self.port, self.timeout):
+            self._record(ip, "closed")
+            return
+
+        try:
+            # Only registered hosts will be connected to again; a scan mustn't fill the pool with the others.
+            facts = get_host_facts(ip, self.user, self.port, self.key_path, timeout=max(self.timeout, 5),
+                                   keep=registry.by_ip(ip) is not None)
+        except Exception as e:
+            self._record(ip, "failed", error=str(e), seconds=round(time.time() - started, 3))
+            return
+        if not facts["mac"]:
+            self._record(ip, "failed", error="Unable to retrieve MAC address", seconds=round(time.time() - started, 3))
+            return
+
+        host = {
+            "id": facts["mac"],
+            "ip": ip,
+            "user": self.user,
+            "port": self.port,
+            "key_path": self.key_path,
+            "added_at": datetime.now().isoformat(),
+            "facts": {key: facts.get(key) for key in ("hostname", "os", "kernel", "arch")},
+        }
+        try:
+            status = add_pending_host(host)
+        except Exception as e:
+            self._record(ip, "failed", error=f"Could not save pending host: {e}", mac=facts["mac"])
+            return
+        self._record(ip, status, mac=facts["mac"], facts=host["facts"], seconds=round(time.time() - started, 3))
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def progress(self, since=0):
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "total": len(self.ips),
+                "counts": dict(self.counts),
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "finished": self.finished,
+                "seconds": round((self.finished_at or time.time()) - self.started_at, 3),
+                "events": self.events[since:],
+            }
+
+
+class DiscoveryService:
+    def __init__(self, max_concurrency=DISCOVERY_CONCURRENCY, max_jobs=MAX_JOBS):
+        self.engine = FanoutEngine(max_concurrency)
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def start(self, targets, user, port=22, key_path=KEY_PATH, timeout=1.0):
+        """Expand targets and discover them in the background; returns the job to poll for progress."""
+        job = DiscoveryJob(uuid.uuid4().hex[:12], expand_targets(targets), user, int(port), key_path, float(timeout))
+        with self._lock:
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                oldest = next((key for key, j in self._jobs.items() if j.finished), None)
+                if oldest is None:
+                    break
+                del self._jobs[oldest]
+
+        def run():
+            try:
+                self.engine.map(job.discover, job.ips)
+            finally:
+                job.finished_at = time.time()
+                print(f"📡 [Discovery] {job.job_id}: {job.counts} in {job.finished_at - job.started_at:.1f}s")
+
+        threading.Thread(target=run, daemon=True, name=f"discovery-{job.job_id}").start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+discovery = DiscoveryService()
@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from config.settings import DISPATCH_MAX_SESSIONS, DISPATCH_MAX_PER_HOST
+from core.metrics import DISPATCH_WAIT
+
+# Lower runs first: someone waiting on a manual run goes ahead of scheduled bulk work.
+MANUAL = 0
+SCHEDULED = 1
+PRIORITY_NAMES = {MANUAL: "manual", SCHEDULED: "scheduled"}
+
+
+class Ticket:
+    def __init__(self, ip, priority, queue):
+        self.ip = ip
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.waited = None
+        # Executions the ticket admits on its host (a coalesced session carries several).
+        self.weight = 1
+        self.admitted = False
+        # Resolved when the slot is granted; sync callers wait on it, the fan-out loop awaits it.
+        self.granted = Future()
+        self.released = False
+        self._queue = queue
+
+    def wait(self):
+        self.granted.result()
+        return self
+
+    def release(self):
+        self._queue._release(self)
+
+
+class DispatchQueue:
+    """
+    Admission control for host executions: at most max_sessions at once overall and
+    max_per_host on any single host.
+
+    Waiting executions are granted in priority order (FIFO within a class). A waiter whose host is
+    already at its cap is skipped, not blocking, so other hosts keep the global slots busy.
+    A ticket may carry several executions on its host (see join()); each counts against max_per_host.
+    """
+
+    def __init__(self, max_sessions=DISPATCH_MAX_SESSIONS, max_per_host=DISPATCH_MAX_PER_HOST):
+        self.max_sessions = max(int(max_sessions), 1)
+        self.max_per_host = max(int(max_per_host), 1)
+        self._lock = threading.Lock()
+        self._waiting = {priority: deque() for priority in PRIORITY_NAMES}
+        self._per_host = {}
+        self.active = 0
+        self._granted = 0
+
+    def request(self, ip, priority=SCHEDULED):
+        """Queue for a slot on ip; the returned ticket's granted future resolves once it may run."""
+        ticket = Ticket(ip, priority, self)
+        with self._lock:
+            self._waiting[priority].append(ticket)
+            granted = self._grant()
+        self._notify(granted)
+        return ticket
+
+    def join(self, ticket, priority=SCHEDULED):
+        """
+        Add one execution to ticket if its host has room for it; returns whether it was added.
+
+        A waiting ticket moves up to priority if that is higher, so a manual run joining
+        scheduled work doesn't wait behind other scheduled work.
+        """
+        with self._lock:
+            if ticket.released or ticket.weight >= self.max_per_host:
+                return False
+            if ticket.admitted:
+                if self._per_host.get(ticket.ip, 0) >= self.max_per_host:
+                    return False
+                self._per_host[ticket.ip] += 1
+            elif priority < ticket.priority:
+                self._waiting[ticket.priority].remove(ticket)
+                ticket.priority = priority
+                self._waiting[priority].append(ticket)
+            ticket.weight += 1
+        return True
+
+    @contextmanager
+    def slot(self, ip, priority=SCHEDULED):
+        ticket = self.request(ip, priority).wait()
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _release(self, ticket):
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self.active -= 1
+            remaining = self._per_host[ticket.ip] - ticket.weight
+            if remaining:
+                self._per_host[ticket.ip] = remaining
+            else:
+                del self._per_host[ticket.ip]
+            granted = self._grant()
+        self._notify(granted)
+
+    def _grant(self):
+        granted = []
+        for priority in sorted(self._waiting):
+            queue = self._waiting[priority]
+            skipped = deque()
+            while queue and self.active < self.max_sessions:
+                ticket = queue.popleft()
+                if self._per_host.get(ticket.ip, 0) + ticket.weight > self.max_per_host:
+                    skipped.append(ticket)
+                    continue
+                self._per_host[ticket.ip] = self._per_host.get(ticket.ip, 0) + ticket.weight
+                ticket.admitted = True
+                self.active += 1
+                granted.append(ticket)
+            if skipped:
+                skipped.extend(queue)
+                self._waiting[priority] = skipped
+        self._granted += len(granted)
+        return granted
+
+    def _notify(self, granted):
+        now = time.monotonic()
+        for ticket in granted:
+            ticket.waited = now - ticket.enqueued_at
+            DISPATCH_WAIT.observe(ticket.waited, priority=PRIORITY_NAMES[ticket.priority])
+            ticket.granted.set_result(ticket)
+
+    def depth(self):
+        with self._lock:
+            return {(PRIORITY_NAMES[priority],): len(queue) for priority, queue in self._waiting.items()}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_sessions": self.max_sessions,
+                "max_per_host": self.max_per_host,
+                "active": self.active,
+                "waiting": {PRIORITY_NAMES[priority]: len(queue) for priority, queue in self._waiting.items()},
+                "busy_hosts": len(self._per_host),
+                "granted": self._granted,
+            }
+
+
+dispatcher = DispatchQueue()
@@ -0,0 +1,100 @@
+import time
+
+import paramiko
+
+from config.settings import ENROLL_CONCURRENCY
+from core.fanout import FanoutEngine
+from core.ssh_service import KEY_PATH, pool
+
+# Reads the public key from stdin, so it never goes through shell interpolation, and appends it
+# only if its "type base64" part is not in authorized_keys yet.
+ENROLL_COMMAND = (
+    "umask 077; mkdir -p ~/.ssh && touch ~/.ssh/authorized_keys && "
+    "key=$(cat) && [ -n \"$key\" ] && fingerprint=$(printf '%s\\n' \"$key\" | cut -d' ' -f1,2) && "
+    "if grep -qF -- \"$fingerprint\" ~/.ssh/authorized_keys; then echo present; else "
+    "if [ -s ~/.ssh/authorized_keys ] && [ -n \"$(tail -c1 ~/.ssh/authorized_keys)\" ]; then echo >> ~/.ssh/authorized_keys; fi; "
+    "printf '%s\\n' \"$key\" >> ~/.ssh/authorized_keys && echo added; fi; "
+    "chmod 700 ~/.ssh && chmod 600 ~/.ssh/authorized_keys"
+)
+
+engine = FanoutEngine(ENROLL_CONCURRENCY)
+
+
+def read_public_key(key_path=KEY_PATH):
+    with open(key_path + ".pub") as f:
+        public_key = f.read().strip()
+    if len(public_key.split()) < 2 or "\n" in public_key:
+        raise ValueError(f"Not a single OpenSSH public key: {key_path}.pub")
+    return public_key
+
+
+def _install(ssh, public_key, timeout):
+    stdin, stdout, stderr = ssh.exec_command(ENROLL_COMMAND, timeout=timeout)
+    stdin.write(public_key + "\n")
+    stdin.channel.shutdown_write()
+    output = stdout.read().decode(errors="replace").strip()
+    exit_code = stdout.channel.recv_exit_status()
+    if exit_code != 0 or output not in ("added", "present"):
+        error = stderr.read().decode(errors="replace").strip()
+        raise RuntimeError(error or f"enrollment command exited with {exit_code}")
+    return output
+
+
+def enroll_host(ip, user, port=22, public_key=None, password=None, auth_key_path=KEY_PATH, timeout=10):
+    """
+    Install public_key in user's authorized_keys on one host; never raises.
+
+    Authenticates with password when one is given, otherwise with the private key at auth_key_path
+    through the shared connection pool. Status is "added", "present" (already enrolled) or "failed".
+    """
+    started = time.time()
+    result = {"ip": ip, "user": user, "port": int(port), "auth": "password" if password else "key"}
+    try:
+        public_key = public_key or read_public_key()
+        if password:
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            try:
+                client.connect(hostname=ip, port=int(port), username=user, password=password,
+                               timeout=timeout, look_for_keys=False, allow_agent=False)
+                result["status"] = _install(client, public_key, timeout)
+            finally:
+                client.close()
+        else:
+            with pool.connection(ip, user, port, key_path=auth_key_path, connect_timeout=timeout,
+                                 wait_timeout=timeout) as ssh:
+                result["status"] = _install(ssh, public_key, timeout)
+    except Exception as e:
+        result.update(status="failed", error=str(e) or e.__class__.__name__)
+    result["seconds"] = round(time.time() - started, 3)
+    return result
+
+
+def enroll_hosts(hosts, password=None, key_path=KEY_PATH, auth_key_path=KEY_PATH, timeout=10):
+    """
+    Enroll the public key of key_path on every host concurrently.
+
+    :param list hosts: dicts with "ip" and optionally "user" and "port"
+    :return: per-host results in input order and a summary with counts and latencies
+    """
+    public_key = read_public_key(key_path)
+
+    def enroll(host):
+        return enroll_host(host["ip"], host.get("user", "root"), host.get("port", 22), public_key,
+                           password=password, auth_key_path=auth_key_path, timeout=timeout)
+
+    started = time.time()
+    results = [
+        {"ip": host["ip"], "status": "failed", "error": str(result), "seconds": None}
+        if isinstance(result, Exception) else result
+        for host, result in zip(hosts, engine.map(enroll, hosts))
+    ]
+
+    latencies = sorted(r["seconds"] for r in results if r.get("seconds") is not None)
+    summary = {"total": len(results), "seconds": round(time.time() - started, 3)}
+    for status in ("added", "present", "failed"):
+        summary[status] = sum(1 for r in results if r["status"] == status)
+    if latencies:
+        summary["latency_p50"] = latencies[len(latencies) // 2]
+        summary["latency_max"] = latencies[-1]
+    return {"results": results, "summary": summary}
@@ -0,0 +1,218 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque, OrderedDict
+from datetime import datetime
+
+LOG_FILE = "logs/executions.jsonl"
+
+
+class ExecutionLogWriter:
+    """Single background writer for execution records.
+
+    Records are queued by any thread, written in batches as JSON lines, and the file is
+    rotated by size and age. A small per-(task, host) index of byte offsets answers
+    "last N runs" queries without scanning the log; it keeps the index_keys most recently
+    written (task, host) pairs and forgets offsets into pruned backups.
+    """
+
+    def __init__(self, path=LOG_FILE, max_bytes=10 * 1024 * 1024, rotate_interval=86400,
+                 backup_count=10, batch_size=500, flush_interval=0.5, index_depth=50, index_keys=10000):
+        self.path = path
+        self.index_path = path + ".index.json"
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.index_depth = index_depth
+        self.index_keys = index_keys
+
+        self._queue = queue.Queue()
+        self._lock = threading.RLock()
+        self._index = OrderedDict()
+        self._indexed_upto = 0
+        self._opened_at = time.time()
+        self._thread = None
+        self._index_dirty = False
+        self._index_saved_at = 0
+
+    def record(self, **fields):
+        fields.setdefault("timestamp", datetime.now().isoformat())
+        self._ensure_started()
+        self._queue.put(fields)
+
+    def flush(self):
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._load_index()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="execution-log")
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                self._save_index()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"❌ [ExecutionLog] Failed to write {len(batch)} record(s): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _index_keys(record):
+        task_id = record.get("task_id")
+        return [f"{task_id}|{record.get('ip')}", f"{task_id}|*"]
+
+    def _add_to_index(self, record, segment, offset):
+        with self._lock:
+            for key in self._index_keys(record):
+                entries = self._index.get(key)
+                if entries is None:
+                    entries = self._index[key] = deque(maxlen=self.index_depth)
+                else:
+                    self._index.move_to_end(key)
+                entries.append((segment, offset))
+            # Manual runs get a fresh task id each time; the least recently written keys make room.
+            while len(self._index) > self.index_keys:
+                self._index.popitem(last=False)
+            self._index_dirty = True
+
+    def _write_batch(self, batch):
+        self._maybe_rotate()
+        segment = os.path.basename(self.path)
+        with open(self.path, "ab") as f:
+            for record in batch:
+                offset = f.tell()
+                f.write((json.dumps(record, default=str) + "\n").encode())
+                self._add_to_index(record, segment, offset)
+            self._indexed_upto = f.tell()
+
+    def _maybe_rotate(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            self._opened_at = time.time()
+            return
+        if size < self.max_bytes and time.time() - self._opened_at < self.rotate_interval:
+            return
+
+        live = os.path.basename(self.path)
+        rotated = f"{live}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        os.replace(self.path, os.path.join(os.path.dirname(self.path), rotated))
+        with self._lock:
+            for entries in self._index.values():
+                for position, (segment, offset) in enumerate(entries):
+                    if segment == live:
+                        entries[position] = (rotated, offset)
+            self._indexed_upto = 0
+            self._index_dirty = True
+        self._opened_at = time.time()
+        self._prune_backups()
+        self._save_index(force=True)
+
+    def _prune_backups(self):
+        directory = os.path.dirname(self.path) or "."
+        live = os.path.basename(self.path)
+        backups = sorted(
+            name for name in os.listdir(directory)
+            if name.startswith(live + ".") and name[len(live) + 1:][:1].isdigit()
+        )
+        pruned = set(backups[:-self.backup_count] if self.backup_count else backups)
+        for name in pruned:
+            os.remove(os.path.join(directory, name))
+        if not pruned:
+            return
+        with self._lock:
+            for key, entries in list(self._index.items()):
+                kept = [entry for entry in entries if entry[0] not in pruned]
+                if not kept:
+                    del self._index[key]
+                elif len(kept) < len(entries):
+                    self._index[key] = deque(kept, maxlen=self.index_depth)
+            self._index_dirty = True
+
+    def _save_index(self, force=False):
+        if not self._index_dirty or (not force and time.time() - self._index_saved_at < 5):
+            return
+        with self._lock:
+            snapshot = {
+                "indexed_upto": self._indexed_upto,
+                "entries": {key: list(entries) for key, entries in self._index.items()},
+            }
+            self._index_dirty = False
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.index_path)
+        self._index_saved_at = time.time()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                snapshot = json.load(f)
+            for key, entries in snapshot.get("entries", {}).items():
+                self._index[key] = deque((tuple(entry) for entry in entries), maxlen=self.index_depth)
+            self._indexed_upto = snapshot.get("indexed_upto", 0)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._indexed_upto = 0
+
+        # Catch up on records written after the index was last saved.
+        if not os.path.exists(self.path):
+            return
+        if os.path.getsize(self.path) < self._indexed_upto:
+            self._indexed_upto = 0
+        segment = os.path.basename(self.path)
+        with open(self.path, "rb") as f:
+            f.seek(self._indexed_upto)
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    self._add_to_index(json.loads(line), segment, offset)
+                except json.JSONDecodeError:
+                    continue
+            self._indexed_upto = offset
+
+    def recent(self, task_id, ip=None, limit=10):
+        self._ensure_started()
+        with self._lock:
+            entries = list(self._index.get(f"{task_id}|{ip or '*'}", ()))[-limit:]
+
+        directory = os.path.dirname(self.path) or "."
+        records = []
+        for segment, offset in reversed(entries):
+            try:
+                with open(os.path.join(directory, segment), "rb") as f:
+                    f.seek(offset)
+                    records.append(json.loads(f.readline()))
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+        return records
+
+
+execution_log = ExecutionLogWriter()
@@ -0,0 +1,176 @@
+import math
+from datetime import datetime, timedelta
+
+
+def wave_size_for(wave_size, host_count):
+    """Hosts per wave of a rolling task: a count ("10") or a share of its machines ("25%")."""
+    text = str(wave_size or "").strip()
+    if text.endswith("%"):
+        size = math.ceil(host_count * float(text[:-1]) / 100)
+    else:
+        size = int(text) if text else host_count
+    return min(max(size, 1), max(host_count, 1))
+
+
+def split_waves(ips, wave_size):
+    size = wave_size_for(wave_size, len(ips))
+    return [ips[start:start + size] for start in range(0, len(ips), size)]
+
+
+def wave_count(task):
+    """Waves per cycle of a rolling task; 1 for other modes (or a wave_size the plan would reject)."""
+    if task.get("execution_mode") != "rolling":
+        return 1
+    try:
+        return len(split_waves(task.get("machines", []), task.get("wave_size"))) or 1
+    except ValueError:
+        return 1
+
+
+class ExecutionPlan:
+    """Closed-form view of a task's schedule.
+
+    Entries are produced lazily and any of them can be computed directly from its index,
+    so totals, end time and next fire time never require building the full list.
+    Fire times are identical to the historical list-based generate_execution_plan.
+    """
+
+    def __init__(self, task):
+        self.start = datetime.fromisoformat(task["start_datetime"])
+        self.executions_per_cycle = int(task.get("executions_per_cycle", 1))
+        self.total_cycles = int(task.get("total_cycles", 1))
+        self.mode = task.get("execution_mode", "parallel")
+        self.machines = list(task.get("machines", []))
+
+        spacing = timedelta(seconds=int(task.get("execution_spacing", 0)))
+        self.timeout = timedelta(seconds=int(task.get("timeout", 0)))
+
+        cycle_every = int(task.get("cycle_every", 0))
+        cycle_unit = task.get("cycle_unit", "minutes")
+        if cycle_unit == "seconds":
+            cycle_delta = timedelta(seconds=cycle_every)
+        elif cycle_unit == "hours":
+            cycle_delta = timedelta(hours=cycle_every)
+        else:
+            cycle_delta = timedelta(minutes=cycle_every)
+
+        if self.mode == "parallel":
+            self.executions = 1
+            self.hosts_per_slot = 1
+            self.execution_step = timedelta(0)
+            self.cycle_length = self.timeout + cycle_delta
+        elif self.mode == "rolling":
+            # One slot per cycle whose entries are its waves; each wave gets a full timeout.
+            self.waves = split_waves(self.machines, task.get("wave_size"))
+            self.executions = 1
+            self.hosts_per_slot = len(self.waves)
+            self.execution_step = timedelta(0)
+            self.cycle_length = max(len(self.waves), 1) * self.timeout + cycle_delta
+        elif self.mode == "sequential":
+            self.executions = self.executions_per_cycle
+            self.hosts_per_slot = len(self.machines)
+            self.execution_step = self.timeout + spacing
+            self.cycle_length = (
+                self.executions * self.timeout
+                + max(self.executions - 1, 0) * spacing
+                + cycle_delta
+            )
+        else:
+            raise ValueError(f"Unknown execution mode: {self.mode}")
+
+    @property
+    def total_slots(self):
+        return max(self.total_cycles, 0) * max(self.executions, 0)
+
+    def __len__(self):
+        return self.total_slots * self.hosts_per_slot
+
+    def slot_time(self, slot):
+        cycle, execution = divmod(slot, self.executions)
+        return self.start + cycle * self.cycle_length + execution * self.execution_step
+
+    def _entries_for_slot(self, slot):
+        cycle, execution = divmod(slot, self.executions)
+        time = self.slot_time(slot).isoformat()
+        if self.mode == "parallel":
+            yield {"cycle": cycle + 1, "ips": self.machines, "time": time}
+        elif self.mode == "rolling":
+            # A wave starts as soon as the previous one is done: its time is the latest it can start.
+            for wave, ips in enumerate(self.waves):
+                wave_time = (self.slot_time(slot) + wave * self.timeout).isoformat()
+                yield {"cycle": cycle + 1, "wave": wave + 1, "ips": ips, "time": wave_time}
+        else:
+            for ip in self.machines:
+                yield {"cycle": cycle + 1, "execution": execution + 1, "ip": ip, "time": time}
+
+    def entry_at(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        slot, host = divmod(index, self.hosts_per_slot)
+        for position, entry in enumerate(self._entries_for_slot(slot)):
+            if position == host:
+                return entry
+
+    def first_slot_at_or_after(self, moment):
+        low, high = 0, self.total_slots
+        while low < high:
+            middle = (low + high) // 2
+            if self.slot_time(middle) < moment:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def first_slot_after(self, moment):
+        low, high = 0, self.total_slots
+        while low < high:
+            middle = (low + high) // 2
+            if self.slot_time(middle) <= moment:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def slots_firing_at(self, moment):
+        """Slots whose fire time is the latest one at or before moment."""
+        last = self.first_slot_after(moment) - 1
+        if last < 0:
+            return []
+        fire_time = self.slot_time(last)
+        first = self.first_slot_at_or_after(fire_time)
+        return list(range(first, last + 1))
+
+    def iter_entries(self, start_slot=0, until=None):
+        for slot in range(start_slot, self.total_slots):
+            if until is not None and self.slot_time(slot) >= until:
+                return
+            yield from self._entries_for_slot(slot)
+
+    def __iter__(self):
+        return self.iter_entries()
+
+    def from_cycle(self, cycle):
+        """Entries starting at 1-based cycle number `cycle`."""
+        return self.iter_entries(max(cycle - 1, 0) * self.executions)
+
+    def between(self, start=None, end=None):
+        """Entries whose fire time falls in [start, end)."""
+        first = self.first_slot_at_or_after(start) if start else 0
+        return self.iter_entries(first, until=end)
+
+    @property
+    def first_fire_time(self):
+        return self.start if self.total_slots else None
+
+    @property
+    def last_fire_time(self):
+        return self.slot_time(self.total_slots - 1) if self.total_slots else None
+
+    @property
+    def end_time(self):
+        last = self.last_fire_time
+        return last + self.timeout if last else None
+
+    def next_fire_time(self, after=None):
+        slot = self.first_slot_at_or_after(after or datetime.now())
+        return self.slot_time(slot) if slot < self.total_slots else None
@@ -1,60 +1,173 @@
-import paramiko
 import os
 import time
-import threading
 import shlex
 import uuid
-from datetime import datetime
-from core.ssh_service import test_ssh_connection, KEY_PATH
-from core.utils import load_hosts
+from concurrent.futures import ThreadPoolExecutor
+
+import paramiko
+
+from core.ssh_service import test_ssh_connection
+from core.host_registry import registry
+from core.fanout import engine
+from core.dispatch import SCHEDULED
+from core.coalescing import coalescer, HostSession
+from core.launch import LaunchBarrier
+from core.upload_cache import upload_cache
+from core.execution_log import execution_log
+from core.output_stream import runs, drain_channel
+from core.deadlines import deadlines
+from core.remote_processes import processes, kill_process
+from core.process_executor import sharded_executor
+from core.metrics import PHASE_SECONDS, EXECUTIONS
+from core.tracing import tracer
+from core.execution_plan import split_waves
+from config.settings import EXECUTOR_BACKEND
 
 SCRIPTS_DIR = "modules/scripts/scripts_drive"
-LOG_FILE = "logs/executions.log"
 
 
-def log_execution(ip, task_id, filename, status, error=None):
-    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-    with open(LOG_FILE, "a") as f:
-        timestamp = datetime.now().isoformat()
-        entry = f"{timestamp} | {ip} | {filename} | {task_id} | {status}"
-        if error:
-            entry += f" | {error}"
-        f.write(entry + "\n")
+# Executor timings are named after what they measure; "connect" there is getting a pooled session.
+TIMING_PHASES = {"precheck": "precheck", "connect": "acquire", "upload": "upload", "exec_start": "exec_start", "run": "run"}
 
 
-def kill_remote_process(ip, user, port, pid_file):
-    try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        pkey = paramiko.RSAKey.from_private_key_file(KEY_PATH)
-        ssh.connect(hostname=ip, port=port, username=user, pkey=pkey)
+def record_metrics(result):
+    EXECUTIONS.inc(status=result["status"])
+    for timing, seconds in (result.get("timings") or {}).items():
+        phase = TIMING_PHASES.get(timing)
+        if phase and seconds is not None:
+            PHASE_SECONDS.observe(seconds, phase=phase)
 
-        stdin, stdout, stderr = ssh.exec_command(f"cat {pid_file}")
-        pid = stdout.read().decode().strip()
 
-        if pid:
-            kill_cmd = f"pkill -TERM -P {pid}; kill -9 {pid}; rm -f {pid_file}"
-        else:
-            kill_cmd = "pkill -f 'mpv'"
+def log_execution(task, result, cycle_index=None, execution_index=None):
+    record_metrics(result)
+    execution_log.record(
+        task_id=task.get("id", "unknown-task"),
+        task_name=task.get("name"),
+        ip=result["ip"],
+        type=task.get("type", "command"),
+        filename=task.get("filename"),
+        cycle=cycle_index,
+        execution=execution_index,
+        status=result["status"],
+        exit_code=result.get("exit_code"),
+        error=result.get("error"),
+        timings=result.get("timings", {}),
+    )
 
-        ssh.exec_command(kill_cmd)
-        ssh.close()
-        print(f"Killed process on {ip} ({'PID' if pid else 'fallback'})")
 
+def kill_remote_process(ip, user, port, pid_file, client=None):
+    try:
+        outcome = kill_process(ip, user, port, pid_file, client)
+        print(f"Killed process on {ip} ({outcome['method']} via {outcome['via']})")
+        return outcome
     except Exception as e:
         print(f"Failed to kill process on {ip}: {e}")
+        return {"ip": ip, "killed": False, "error": str(e)}
+
+
+def trace_span(trace, name, start, ip, end=None, **attrs):
+    if trace:
+        tracer.record(trace[0], name, start, end or time.time(), parent_id=trace[1], ip=ip, **attrs)
+
+
+def kill_on_timeout(process, kind):
+    started = time.time()
+    outcome = kill_remote_process(process.ip, process.user, process.port, process.pid_file, process.client)
+    trace_span(process.trace, "kill", started, process.ip, reason="timeout", killed=outcome.get("killed"))
+    processes.unregister(process)
+    print(f"Timeout reached — killed {kind} process on {process.ip}")
+
+
+def stop_task(task_id):
+    """Kill every process of a task on every host at once and report per-host outcomes."""
+    targets = processes.for_task(task_id)
+    if not targets:
+        return []
+
+    def stop(process):
+        process.stopped = True
+        if process.deadline is not None:
+            process.deadline.cancel()
+        started = time.time()
+        outcome = kill_remote_process(process.ip, process.user, process.port, process.pid_file, process.client)
+        trace_span(process.trace, "kill", started, process.ip, reason="stop", killed=outcome.get("killed"))
+        processes.unregister(process)
+        return outcome
+
+    print(f"⏹ Stopping task {task_id} on {len(targets)} process(es)...")
+    with ThreadPoolExecutor(max_workers=min(len(targets), 64), thread_name_prefix="stop") as workers:
+        return list(workers.map(stop, targets))
+
+
+def stop_task_everywhere(task_id):
+    """stop_task here and, with the process backend, in every executor worker."""
+    outcomes = stop_task(task_id)
+    if EXECUTOR_BACKEND == "processes":
+        outcomes += sharded_executor.stop_task(task_id)
+    return outcomes
 
 
 def prepare_ssh(ip, user, port, max_time=1.5):
+    """Open and authenticate a pooled connection to ip, left idle in the pool for the next execution."""
     deadline = time.time() + max_time
     while time.time() < deadline:
-        if test_ssh_connection(ip, user, port):
+        if test_ssh_connection(ip, user, port, retries=1, delay=0):
             return True
         time.sleep(0.2)
     return False
 
 
-def run_task(task, ip, execution_index=0, executions_per_cycle=1, execution_spacing=0):
+def prewarm_hosts(ips, hosts=None):
+    """Connect to every ip ahead of a planned fire so the execution finds a warm connection; returns {ip: ok}."""
+    if EXECUTOR_BACKEND == "processes" and hosts is None:
+        # Connections live in the pool of the worker that owns the host's shard.
+        sharded_executor.prewarm(ips)
+        return {}
+
+    def warm(ip):
+        host = (hosts or {}).get(ip) or registry.by_ip(ip)
+        if not host:
+            return False
+        return prepare_ssh(ip, host.get("user", "root"), int(host.get("port", 22)))
+
+    started = time.time()
+    outcomes = engine.map(warm, ips)
+    warmed = {ip: outcome is True for ip, outcome in zip(ips, outcomes)}
+    print(f"🔥 Pre-warmed {sum(warmed.values())}/{len(ips)} connection(s) in {time.time() - started:.2f}s")
+    return warmed
+
+
+def launch_barrier(parties, **kwargs):
+    """A barrier for hosts launched together; it waits for the hosts admitted to run, not for the whole list."""
+    return LaunchBarrier(parties, admission=True, **kwargs)
+
+
+def execute_on_host(task, ip, run, host=None, label="", session=None, barrier=None):
+    """
+    Run task on one host; the whole execution and each of its phases are traced under run's trace.
+
+    session is the HostSession this execution was coalesced into; without one it gets its own.
+    With a LaunchBarrier, the command is launched once the other hosts of the fire are ready too.
+    """
+    own_session = session is None
+    if own_session:
+        session = HostSession(ip)
+    trace = (run.run_id, tracer.new_span_id())
+    started = time.time()
+    try:
+        result = _execute_on_host(task, ip, run, host, label, trace, session, barrier)
+    finally:
+        if barrier is not None:
+            barrier.withdraw(ip)
+        if own_session:
+            session.close()
+    tracer.record(trace[0], "host", started, time.time(), parent_id=run.run_id, span_id=trace[1], ip=ip,
+                  task_id=task.get("id"), status=result["status"], exit_code=result.get("exit_code"),
+                  coalesced=session.size)
+    return result
+
+
+def _execute_on_host(task, ip, run, host, label, trace, session, barrier):
     task_type = task.get("type", "command")
     script_name = task.get("filename", "")
     remote_name = task.get("remote_name") or "script.sh"
@@ -62,37 +175,48 @@ def run_task(task, ip, execution_index=0, executions_per_cycle=1, execution_spac
     task_id = task.get("id", "unknown-task")
     detach = task.get("detach", False) if task_type == "command" else False
 
-    hosts = load_hosts()
-    host = next((h for h in hosts if h["ip"] == ip), None)
+    if host is None:
+        host = registry.by_ip(ip)
     if not host:
         print(f"Host not found: {ip}")
-        return
+        return {"ip": ip, "status": "host_not_found", "exit_code": None}
 
     user = host.get("user", "root")
     port = int(host.get("port", 22))
-
-    print(f"Preparing SSH to {ip}...")
-    deadline = time.time() + 3
-    while time.time() < deadline:
-        if test_ssh_connection(ip, user, port):
-            break
-        time.sleep(0.2)
-    else:
+    timings = {}
+
+    print(f"Preparing SSH to {ip}{label}...")
+    if session.size > 1:
+        print(f"Sharing one SSH session on {ip} between {session.size} executions")
+    # Reachability and connection are shared by the session: the first member does them, the others reuse them.
+    session.open(user, port)
+    started, ended = session.phases["precheck"]
+    trace_span(trace, "precheck", started, ip, end=ended, reachable=session.reachable)
+    if not session.reachable:
         print(f"SSH unreachable: {ip}")
-        return
+        return {"ip": ip, "status": "unreachable", "exit_code": None}
+    timings["precheck"] = round(ended - started, 3)
 
+    result = {"ip": ip, "status": "detached", "exit_code": None, "timings": timings, "run_id": run.run_id}
     try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        pkey = paramiko.RSAKey.from_private_key_file(KEY_PATH)
-        ssh.connect(hostname=ip, port=port, username=user, pkey=pkey)
-        sftp = ssh.open_sftp()
+        started, ended = session.phases["connect"]
+        if session.error is not None:
+            raise session.error
+        ssh = session.client
+        timings["connect"] = round(ended - started, 3)
+        trace_span(trace, "connect", started, ip, end=ended)
 
         if task_type == "script" and script_name:
             local_path = os.path.join(SCRIPTS_DIR, script_name)
             remote_path = f"/tmp/{remote_name}"
-            sftp.put(local_path, remote_path)
-            sftp.chmod(remote_path, 0o755)
+            started = time.time()
+            upload = upload_cache.ensure(ssh, session.sftp, local_path, remote_path)
+            timings["upload"] = upload["seconds"]
+            trace_span(trace, "upload", started, ip, uploaded=upload["uploaded"], bytes=upload["bytes"])
+            if upload["uploaded"]:
+                print(f"Uploaded {script_name} to {ip} ({upload['bytes']} bytes in {upload['seconds']}s)")
+            else:
+                print(f"{script_name} already up to date on {ip} — skipped {upload['bytes']} bytes")
             command = f"{remote_path}"
         elif task_type == "command":
             command = task.get("command", "")
@@ -105,131 +229,217 @@ def run_task(task, ip, execution_index=0, executions_per_cycle=1, execution_spac
         base_cmd = f"export DISPLAY=:0; export XAUTHORITY={xauth}; {command}"
         pid_file = f"/tmp/pid_{task_id.replace('-', '')}_{ip.replace('.', '')}_{uuid.uuid4().hex[:6]}.txt"
 
+        if barrier is not None:
+            started = time.time()
+            timings["barrier"] = round(barrier.wait(ip), 3)
+            trace_span(trace, "barrier", started, ip, timed_out=barrier.timed_out)
+
+        started = time.time()
+        # setsid makes the launched shell a process-group leader so a stop can kill the whole tree.
         if detach:
-            full_cmd = f'nohup bash -c {shlex.quote(base_cmd)} > /dev/null 2>&1 & echo $! > {pid_file}'
+            full_cmd = f'nohup setsid bash -c {shlex.quote(base_cmd)} > /dev/null 2>&1 & echo $! > {pid_file}'
             ssh.exec_command(full_cmd)
+            result["launched_at"] = time.time()
+            timings["exec_start"] = round(time.time() - started, 3)
+            trace_span(trace, "exec_start", started, ip, detached=True)
             print(f"Detached command launched on {ip}")
+            process = processes.register(task_id, ip, user, port, pid_file)
+            process.trace = trace
             if timeout > 0:
-                def delayed_kill():
-                    time.sleep(timeout)
-                    kill_remote_process(ip, user, port, pid_file)
-                    print(f"Timeout reached — killed detached process on {ip}")
-                threading.Thread(target=delayed_kill, daemon=True).start()
+                process.deadline = deadlines.schedule(timeout, kill_on_timeout, process, "detached")
         else:
             full_cmd = (
                 f"export DISPLAY=:0; export XAUTHORITY={xauth}; "
-                f"bash -c '{command}' & echo $! > {pid_file}; wait $(cat {pid_file})"
+                f"setsid bash -c '{command}' & pid=$!; echo $pid > {pid_file}; wait $pid; "
+                f"status=$?; rm -f {pid_file}; exit $status"
             )
             stdin, stdout, stderr = ssh.exec_command(full_cmd)
+            result["launched_at"] = time.time()
+            timings["exec_start"] = round(time.time() - started, 3)
+            trace_span(trace, "exec_start", started, ip, detached=False)
+            run.host_started(ip)
 
+            process = processes.register(task_id, ip, user, port, pid_file, client=ssh)
+            process.trace = trace
             if timeout > 0:
-                def delayed_kill():
-                    time.sleep(timeout)
-                    kill_remote_process(ip, user, port, pid_file)
-                    print(f"Timeout reached — killed foreground process on {ip}")
-                threading.Thread(target=delayed_kill, daemon=True).start()
-
-            exit_status = stdout.channel.recv_exit_status()
+                process.deadline = deadlines.schedule(timeout, kill_on_timeout, process, "foreground")
+
+            try:
+                exit_status = drain_channel(stdout.channel, run, ip)
+            finally:
+                if process.deadline is not None:
+                    process.deadline.cancel()
+                processes.unregister(process)
+            timings["run"] = round(time.time() - started, 3)
+            trace_span(trace, "run", started, ip, exit_code=exit_status)
             print(f"Task completed on {ip} (exit: {exit_status})")
-
-            if execution_index < executions_per_cycle - 1 and execution_spacing > 0:
-                print(f"Waiting {execution_spacing}s before next execution")
-                time.sleep(execution_spacing)
-
-        sftp.close()
-        ssh.close()
+            if process.stopped:
+                result.update(status="stopped", exit_code=exit_status)
+            elif process.deadline is not None and process.deadline.fired:
+                result.update(status="timeout", exit_code=exit_status)
+            else:
+                result.update(status="success" if exit_status == 0 else "failed", exit_code=exit_status)
 
     except Exception as e:
+        if isinstance(e, (paramiko.SSHException, OSError)):
+            # The connection itself may be broken; other errors (bad task, missing script...) leave it reusable.
+            session.discard()
         print(f"Error during execution on {ip}: {e}")
+        return {"ip": ip, "status": "error", "exit_code": None, "error": str(e), "timings": timings}
 
+    return result
 
-def run_cycle(task, ips, cycle_index):
-    task_type = task.get("type", "command")
-    script_name = task.get("filename", "")
-    remote_name = task.get("remote_name") or "script.sh"
-    timeout = float(task.get("timeout", 0))
-    task_id = task.get("id", "unknown-task")
-    detach = task.get("detach", False) if task_type == "command" else False
 
-    hosts = load_hosts()
-    host_map = {h["ip"]: h for h in hosts}
+def execute_on_hosts(task, ips, run, label="", on_result=None, priority=SCHEDULED, barrier=None):
+    """
+    Run task on every ip with the configured backend; returns {ip: result} and calls on_result as hosts finish.
 
-    def execute_on_ip(ip):
-        host = host_map.get(ip)
-        if not host:
-            print(f"Host not found: {ip}")
-            return
-
-        user = host.get("user", "root")
-        port = int(host.get("port", 22))
-
-        print(f"Preparing SSH for {ip} (cycle {cycle_index})...")
-        deadline = time.time() + 3
-        while time.time() < deadline:
-            if test_ssh_connection(ip, user, port):
-                break
-            time.sleep(0.2)
-        else:
-            print(f"SSH unreachable: {ip}")
-            return
-
-        try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            pkey = paramiko.RSAKey.from_private_key_file(KEY_PATH)
-            ssh.connect(hostname=ip, port=port, username=user, pkey=pkey)
-            sftp = ssh.open_sftp()
-
-            if task_type == "script" and script_name:
-                local_path = os.path.join(SCRIPTS_DIR, script_name)
-                remote_path = f"/tmp/{remote_name}"
-                sftp.put(local_path, remote_path)
-                sftp.chmod(remote_path, 0o755)
-                command = f"{remote_path}"
-            elif task_type == "command":
-                command = task.get("command", "")
-            else:
-                raise ValueError("Missing or unknown task type")
+    Each host waits in the dispatch queue at the given priority before it starts, and at the
+    barrier (if any) before it launches the command.
+    """
+    if EXECUTOR_BACKEND == "processes":
+        return sharded_executor.execute(task, ips, run, label, on_result, priority, barrier)
 
-            user_home = f"/home/{user}"
-            xauth = f"{user_home}/.XAUTHORITY"
-            command = command.replace("~", user_home)
-            pid_file = f"/tmp/pid_{task_id.replace('-', '')}_{ip.replace('.', '')}_{uuid.uuid4().hex[:6]}.txt"
+    tickets = {}
 
-            if detach:
-                full_cmd = f'nohup bash -c {shlex.quote(command)} > /dev/null 2>&1 & echo $! > {pid_file}'
-                ssh.exec_command(full_cmd)
-            else:
-                full_cmd = (
-                    f"export DISPLAY=:0; export XAUTHORITY={xauth}; "
-                    f"bash -c '{command}' & echo $! > {pid_file}; wait $(cat {pid_file})"
-                )
-                stdin, stdout, stderr = ssh.exec_command(full_cmd)
+    def admit(ip):
+        # Each host joins its pending session, which the dispatch queue admits as one slot.
+        tickets[ip] = coalescer.request(ip, priority)
+        return tickets[ip]
 
-                def delayed_kill():
-                    time.sleep(timeout)
-                    kill_remote_process(ip, user, port, pid_file)
+    def execute_on_ip(ip):
+        if barrier is not None:
+            # Dispatch granted the host a slot and it has a worker: the barrier waits for it.
+            barrier.admit(ip)
+        result = execute_on_host(task, ip, run, label=label, session=tickets[ip].session, barrier=barrier)
+        if on_result:
+            on_result(ip, result)
+        return result
+
+    results = {}
+    for ip, outcome in zip(ips, engine.map(execute_on_ip, ips, admit=admit)):
+        if isinstance(outcome, Exception):
+            outcome = {"ip": ip, "status": "error", "exit_code": None, "error": str(outcome)}
+        results[ip] = outcome
+    return results
+
+
+def run_task(task, ip, execution_index=0, executions_per_cycle=1, execution_spacing=0, run=None, priority=SCHEDULED,
+             barrier=None):
+    """
+    Run one execution of task on ip; with a barrier shared by the slot's jobs, the hosts launch together.
+
+    With the processes executor the barrier can't reach into the worker: the host waits at it
+    before being handed over, so the launch follows it by one (pre-warmed) connection and dispatch.
+    """
+    owns_run = run is None
+    if owns_run:
+        run = runs.create(task.get("id"), f"{task.get('name') or task.get('id')} @ {ip} [E{execution_index + 1}]")
+
+    if EXECUTOR_BACKEND == "processes":
+        if barrier is not None:
+            barrier.wait(ip)
+        result = execute_on_hosts(task, [ip], run, priority=priority)[ip]
+    else:
+        with coalescer.slot(ip, priority) as ticket:
+            result = execute_on_host(task, ip, run, session=ticket.session, barrier=barrier)
+    if barrier is not None:
+        barrier.record(ip, result)
+    run.host_finished(ip, result["status"], result.get("exit_code"))
+    if owns_run:
+        run.close()
+    log_execution(task, result, execution_index=execution_index + 1)
 
-                if timeout > 0:
-                    threading.Thread(target=delayed_kill, daemon=True).start()
+    if result["status"] in ("success", "failed") and execution_index < executions_per_cycle - 1 and execution_spacing > 0:
+        print(f"Waiting {execution_spacing}s before next execution")
+        time.sleep(execution_spacing)
 
-                exit_status = stdout.channel.recv_exit_status()
-                print(f"{ip} — finished (exit {exit_status})")
+    return result
 
-            sftp.close()
-            ssh.close()
 
-        except Exception as e:
-            print(f"Error during execution on {ip}: {e}")
+def run_cycle(task, ips, cycle_index):
+    name = task.get("name") or task.get("id")
+    run = runs.create(task.get("id"), f"{name} — cycle {cycle_index}")
+    barrier = launch_barrier(len(ips), task_id=task.get("id"), label=f"{name} cycle {cycle_index}")
 
-    print(f"Launching parallel cycle {cycle_index} for {len(ips)} IP(s)...")
-    threads = []
-    for ip in ips:
-        t = threading.Thread(target=execute_on_ip)
-        t.start()
-        threads.append(t)
+    def finished(ip, result):
+        barrier.record(ip, result)
+        run.host_finished(ip, result["status"], result.get("exit_code"))
+        log_execution(task, result, cycle_index=cycle_index)
 
-    for t in threads:
-        t.join()
+    print(f"Launching parallel cycle {cycle_index} for {len(ips)} IP(s)...")
+    results = execute_on_hosts(task, ips, run, label=f" (cycle {cycle_index})", on_result=finished, barrier=barrier)
+
+    run.close()
+    failed = sum(1 for r in results.values() if r["status"] not in ("success", "detached"))
+    print(f"Parallel cycle {cycle_index} completed ({len(results) - failed} ok, {failed} failed)")
+    return results
+
+
+def run_waves(task, ips, cycle_index):
+    """
+    Rolling cycle: run the hosts wave by wave, each wave starting as soon as the previous one is done.
+
+    The rollout stops when the share of failed hosts so far goes above the task's
+    wave_failure_threshold (percent) or when the task is stopped; the remaining hosts are
+    logged as aborted.
+    """
+    waves = split_waves(list(ips), task.get("wave_size"))
+    threshold = float(task.get("wave_failure_threshold", 100))
+    run = runs.create(task.get("id"), f"{task.get('name') or task.get('id')} — cycle {cycle_index} ({len(waves)} waves)")
+
+    def finished(ip, result):
+        if ip in barriers:
+            barriers[ip].record(ip, result)
+        run.host_finished(ip, result["status"], result.get("exit_code"))
+        log_execution(task, result, cycle_index=cycle_index)
+
+    barriers = {}
+    print(f"Launching rolling cycle {cycle_index}: {len(ips)} IP(s) in {len(waves)} wave(s)...")
+    results = {}
+    abort_reason = None
+    for number, wave in enumerate(waves, 1):
+        started = time.time()
+        barrier = launch_barrier(len(wave), task_id=task.get("id"),
+                                 label=f"{task.get('name') or task.get('id')} cycle {cycle_index} wave {number}")
+        barriers.update(dict.fromkeys(wave, barrier))
+        wave_results = execute_on_hosts(task, wave, run, label=f" (cycle {cycle_index}, wave {number})",
+                                        on_result=finished, barrier=barrier)
+        results.update(wave_results)
+
+        wave_failed = sum(1 for r in wave_results.values() if r["status"] not in ("success", "detached"))
+        failed = sum(1 for r in results.values() if r["status"] not in ("success", "detached"))
+        failure_rate = 100 * failed / len(results)
+        tracer.record(run.run_id, f"wave {number}", started, time.time(), parent_id=run.run_id,
+                      task_id=task.get("id"), hosts=len(wave), failed=wave_failed)
+        print(f"Wave {number}/{len(waves)} done: {len(wave) - wave_failed} ok, {wave_failed} failed "
+              f"({failure_rate:.0f}% failed so far)")
+
+        if number == len(waves):
+            break
+        if any(r["status"] == "stopped" for r in wave_results.values()):
+            abort_reason = f"rollout stopped during wave {number}"
+        elif failure_rate > threshold:
+            abort_reason = f"rollout aborted after wave {number}: {failure_rate:.0f}% failed (threshold {threshold:g}%)"
+        if abort_reason:
+            break
 
-    print(f"Parallel cycle {cycle_index} completed")
+    if abort_reason:
+        print(f"⛔ {abort_reason}")
+        for ip in ips:
+            if ip not in results:
+                results[ip] = {"ip": ip, "status": "aborted", "exit_code": None, "error": abort_reason}
+                finished(ip, results[ip])
+
+    run.close()
+    failed = sum(1 for r in results.values() if r["status"] not in ("success", "detached"))
+    print(f"Rolling cycle {cycle_index} completed ({len(results) - failed} ok, {failed} failed or aborted)")
+    return results
+
+
+def dispatch_task(task, target, *args, **kwargs):
+    if isinstance(target, (list, tuple)):
+        if task.get("execution_mode") == "rolling":
+            return run_waves(task, target, *args, **kwargs)
+        return run_cycle(task, target, *args, **kwargs)
+    return run_task(task, target, *args, **kwargs)
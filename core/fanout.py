@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import MAX_CONCURRENCY
+
+
+class FanoutEngine:
+    """Runs blocking per-host work on one event loop, never more than max_concurrency at a time."""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+        self.active = 0
+        self.waiting = 0
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(
+                ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="fanout")
+            )
+            threading.Thread(target=loop.run_forever, daemon=True, name="fanout-loop").start()
+            self._loop = loop
+            return loop
+
+    @staticmethod
+    def _run(func, item, ticket):
+        # Releasing a ticket may close a host session (SFTP, pool, transport I/O), so it happens here on
+        # the worker thread, never on the loop.
+        try:
+            return func(item)
+        finally:
+            if ticket is not None:
+                ticket.release()
+
+    async def _call(self, func, item, admit):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        ticket = None
+        handed_off = False
+        self.waiting += 1
+        try:
+            # Admission is awaited on the loop, so queued items hold no worker thread while they wait.
+            try:
+                ticket = admit(item) if admit else None
+                if ticket is not None:
+                    await asyncio.wrap_future(ticket.granted)
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            try:
+                handed_off = True
+                return await loop.run_in_executor(None, self._run, func, item, ticket)
+            finally:
+                self.active -= 1
+                self._semaphore.release()
+        finally:
+            if ticket is not None and not handed_off:
+                # Admission failed or was cancelled before func ran; still release off the loop thread.
+                loop.run_in_executor(None, ticket.release)
+
+    async def _gather(self, func, items, admit):
+        return await asyncio.gather(*(self._call(func, item, admit) for item in items), return_exceptions=True)
+
+    def map(self, func, items, admit=None):
+        """
+        Call func(item) for every item and return the results in order; exceptions are returned, not raised.
+
+        admit(item), if given, returns a dispatch ticket that must be granted before func runs.
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._gather(func, list(items), admit), loop)
+        return future.result()
+
+    def stats(self):
+        return {"max_concurrency": self.max_concurrency, "active": self.active, "waiting": self.waiting}
+
+
+engine = FanoutEngine()
@@ -5,21 +5,44 @@ import time
 import os
 
 from core.scheduler_service import validate_and_schedule_tasks
-from core.utils import load_hosts
+from core.task_store import store
+from core.host_registry import registry
 
 class SchedulerFileChangeHandler(FileSystemEventHandler):
-    def __init__(self, scheduler, callback, debounce_delay=2.0):
+    def __init__(self, scheduler, callback, debounce_delay=2.0, filename="scheduled_events.json", extra_files=None):
         super().__init__()
         self.scheduler = scheduler
         self.callback = callback
+        # File name -> hook run before rescheduling (e.g. dropping a cache)
+        self.watched = {filename: None} if filename else {}
+        self.watched.update(extra_files or {})
         self.last_modified = 0
         self.debounce_delay = debounce_delay
         self.lock = threading.Lock()
 
+    def _matched_file(self, event):
+        if event.is_directory:
+            return None
+        for path in [event.src_path, getattr(event, "dest_path", "")]:
+            name = os.path.basename(path) if path else None
+            if name in self.watched:
+                return name
+        return None
+
     def on_modified(self, event):
-        if event.is_directory or not event.src_path.endswith("scheduled_events.json"):
+        name = self._matched_file(event)
+        if name is None:
             return
+        hook = self.watched[name]
+        if hook:
+            hook()
+        self.trigger()
+
+    # Atomic saves replace the file, which shows up as a move or create rather than a modify.
+    on_moved = on_modified
+    on_created = on_modified
 
+    def trigger(self):
         now = time.time()
         if now - self.last_modified < self.debounce_delay:
             return
@@ -33,8 +56,7 @@ class SchedulerFileChangeHandler(FileSystemEventHandler):
         def refresh():
             try:
                 print("🔁 [Watcher] Change detected — rescheduling...")
-                hosts = load_hosts()
-                validate_and_schedule_tasks(self.scheduler, self.callback, hosts)
+                validate_and_schedule_tasks(self.scheduler, self.callback)
             except Exception as e:
                 print(f"❌ [Watcher] Failed to reschedule: {e}")
             finally:
@@ -43,12 +65,26 @@ class SchedulerFileChangeHandler(FileSystemEventHandler):
         threading.Thread(target=refresh, daemon=True).start()
 
 def start_file_watcher(scheduler, callback, path="modules/scheduler/data"):
+    hosts_dir = os.path.dirname(registry.path)
+    hosts_file = {os.path.basename(registry.path): registry.invalidate}
+
+    if store.watch_path is None:
+        handler = SchedulerFileChangeHandler(scheduler, callback, filename=None, extra_files=hosts_file)
+        store.subscribe(handler.trigger)
+        print("👁️ [Watcher] Subscribed to task store changes")
+        watched_dirs = [hosts_dir]
+    else:
+        handler = SchedulerFileChangeHandler(
+            scheduler, callback, filename=store.watch_path.name, extra_files=hosts_file
+        )
+        watched_dirs = [path, hosts_dir]
+
     def run():
         observer = Observer()
-        handler = SchedulerFileChangeHandler(scheduler, callback)
-        observer.schedule(handler, path=path, recursive=False)
+        for directory in watched_dirs:
+            observer.schedule(handler, path=directory, recursive=False)
         observer.start()
-        print("👁️ [Watcher] File watcher started on:", path)
+        print("👁️ [Watcher] File watcher started on:", ", ".join(watched_dirs))
         try:
             while True:
                 time.sleep(1)
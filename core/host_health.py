@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.ssh_service import pool, KEY_PATH
+
+PROBE_TIMEOUT = 3
+
+
+class HostHealthProber:
+    """Probes tracked hosts in the background and serves their reachability from a TTL cache."""
+
+    def __init__(self, ttl=15, negative_ttl=30, interval=1.0, max_workers=32, forget_after=600):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.interval = interval
+        self.max_workers = max_workers
+        self.forget_after = forget_after
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._tracked = {}
+        self._cache = {}
+        self._in_flight = set()
+        self._thread = None
+
+    @staticmethod
+    def _key(host):
+        return (host["ip"], int(host.get("port", 22)), host.get("user", "root"))
+
+    def track(self, hosts):
+        now = time.time()
+        added = False
+        with self._lock:
+            for host in hosts:
+                key = self._key(host)
+                if key not in self._tracked:
+                    added = True
+                self._tracked[key] = (host.get("key_path", KEY_PATH), now)
+        if added:
+            self._wake.set()
+
+    def status(self, host):
+        key = self._key(host)
+        with self._lock:
+            entry = self._cache.get(key)
+        if not entry:
+            return {"connected": None, "checked_at": None, "status_age": None, "latency": None}
+        return {
+            "connected": entry["connected"],
+            "checked_at": entry["checked_at"],
+            "status_age": round(time.time() - entry["checked_at"], 1),
+            "latency": entry["latency"],
+        }
+
+    def annotate(self, hosts):
+        self.track(hosts)
+        for host in hosts:
+            host.update(self.status(host))
+        return hosts
+
+    def invalidate(self, host):
+        with self._lock:
+            self._cache.pop(self._key(host), None)
+        self._wake.set()
+
+    def _is_due(self, key, now):
+        entry = self._cache.get(key)
+        if entry is None:
+            return True
+        ttl = self.ttl if entry["connected"] else self.negative_ttl
+        return now - entry["checked_at"] >= ttl
+
+    def _collect_due(self):
+        now = time.time()
+        due = []
+        with self._lock:
+            for key, (key_path, last_requested) in list(self._tracked.items()):
+                if now - last_requested > self.forget_after:
+                    del self._tracked[key]
+                    self._cache.pop(key, None)
+                    continue
+                if key not in self._in_flight and self._is_due(key, now):
+                    self._in_flight.add(key)
+                    due.append((key, key_path))
+        return due
+
+    def _probe(self, key, key_path):
+        ip, port, user = key
+        started = time.time()
+        try:
+            with pool.connection(ip, user, port, key_path=key_path, connect_timeout=PROBE_TIMEOUT,
+                                 wait_timeout=PROBE_TIMEOUT) as ssh:
+                # A real exec round trip: an idle pooled connection can look healthy well after its host went away.
+                stdin, stdout, stderr = ssh.exec_command("true", timeout=PROBE_TIMEOUT)
+                stdout.read()
+                connected = stdout.channel.recv_exit_status() == 0
+        except Exception:
+            connected = False
+        finished = time.time()
+        with self._lock:
+            self._cache[key] = {
+                "connected": connected,
+                "checked_at": finished,
+                "latency": round(finished - started, 3),
+            }
+            self._in_flight.discard(key)
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="host-probe") as executor:
+            while True:
+                for key, key_path in self._collect_due():
+                    executor.submit(self._probe, key, key_path)
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name="host-health")
+            self._thread.start()
+        print("🩺 [Health] Host prober started")
+
+
+prober = HostHealthProber()
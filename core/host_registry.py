@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+
+HOSTS_FILE = "modules/hosts/data/hosts.json"
+
+
+class HostRegistry:
+    """hosts.json parsed once, indexed by IP and MAC, and reloaded only when the file changes."""
+
+    def __init__(self, path=HOSTS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = False
+        self._hosts = []
+        self._by_ip = {}
+        self._by_mac = {}
+        self.version = 0
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self):
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        hosts = []
+        if signature is not None:
+            try:
+                with open(self.path, "r") as f:
+                    hosts = json.load(f)
+            except json.JSONDecodeError as e:
+                print(f"❌ [Hosts] {self.path} is not valid JSON ({e}) — keeping the last good copy")
+                self._signature = signature
+                return
+        self._signature = signature
+        self._hosts = hosts
+        self._by_ip = {host.get("ip"): host for host in hosts}
+        self._by_mac = {host.get("id"): host for host in hosts if host.get("id")}
+        self.version += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = False
+
+    def all(self):
+        with self._lock:
+            self._refresh()
+            return [dict(host) for host in self._hosts]
+
+    def by_ip(self, ip):
+        with self._lock:
+            self._refresh()
+            host = self._by_ip.get(ip)
+            return dict(host) if host else None
+
+    def by_mac(self, mac):
+        with self._lock:
+            self._refresh()
+            host = self._by_mac.get(mac)
+            return dict(host) if host else None
+
+
+registry = HostRegistry()
@@ -0,0 +1,146 @@
+import pickle
+import sqlite3
+import threading
+from pathlib import Path
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+from config.settings import JOBSTORE_DB_PATH
+
+
+class SqliteJobStore(BaseJobStore):
+    """APScheduler jobstore on the standard library's sqlite3, in WAL mode like the task store.
+
+    Same table layout as APScheduler's SQLAlchemyJobStore, without the SQLAlchemy dependency.
+    """
+
+    def __init__(self, path=JOBSTORE_DB_PATH, tablename="apscheduler_jobs", pickle_protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.path = Path(path)
+        self.tablename = tablename
+        self.pickle_protocol = pickle_protocol
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self._connect()
+
+    def _connect(self):
+        with self._lock:
+            if self._conn is not None:
+                return self._conn
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.tablename} ("
+                " id TEXT PRIMARY KEY, next_run_time REAL, job_state BLOB NOT NULL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.tablename}_next_run_time ON {self.tablename} (next_run_time)"
+            )
+            return self._conn
+
+    def count(self):
+        """Number of persisted jobs, without unpickling any of them."""
+        with self._lock:
+            return self._connect().execute(f"SELECT COUNT(*) FROM {self.tablename}").fetchone()[0]
+
+    def lookup_job(self, job_id):
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT job_state FROM {self.tablename} WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._reconstitute_job(row[0]) if row else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT next_run_time FROM {self.tablename} WHERE next_run_time IS NOT NULL "
+                "ORDER BY next_run_time LIMIT 1"
+            ).fetchone()
+        return utc_timestamp_to_datetime(row[0]) if row else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        with self._lock:
+            try:
+                self._connect().execute(
+                    f"INSERT INTO {self.tablename} (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                    (job.id, datetime_to_utc_timestamp(job.next_run_time), self._serialize(job)),
+                )
+            except sqlite3.IntegrityError:
+                raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        with self._lock:
+            cursor = self._connect().execute(
+                f"UPDATE {self.tablename} SET next_run_time = ?, job_state = ? WHERE id = ?",
+                (datetime_to_utc_timestamp(job.next_run_time), self._serialize(job), job.id),
+            )
+        if cursor.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        with self._lock:
+            cursor = self._connect().execute(f"DELETE FROM {self.tablename} WHERE id = ?", (job_id,))
+        if cursor.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with self._lock:
+            self._connect().execute(f"DELETE FROM {self.tablename}")
+
+    def shutdown(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _serialize(self, job):
+        return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state["jobstore"] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where="", params=()):
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT id, job_state FROM {self.tablename} {where} ORDER BY next_run_time", params
+            ).fetchall()
+
+        jobs = []
+        failed_job_ids = []
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except BaseException:
+                self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                failed_job_ids.append(job_id)
+
+        if failed_job_ids:
+            with self._lock:
+                self._connect().executemany(
+                    f"DELETE FROM {self.tablename} WHERE id = ?", [(job_id,) for job_id in failed_job_ids]
+                )
+        return jobs
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (path={self.path})>"
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from config.settings import LAUNCH_BARRIER_SECONDS
+from core.metrics import START_SKEW
+
+MAX_REPORTS = 200
+# Barriers shared by separate jobs (sequential mode) are forgotten after this long even if incomplete.
+SHARED_BARRIER_TTL = 600
+
+
+class LaunchBarrier:
+    """
+    Holds the hosts of one scheduled fire right before they launch their command, then lets them
+    go together, so connection setup differences don't turn into start-time skew.
+
+    It opens once quorum hosts are ready (hosts that failed earlier withdraw) or timeout seconds
+    after the first one arrived. With admission set there is no fixed quorum: it opens once every
+    host admitted so far (see admit()) is ready, so hosts still queued for a slot aren't waited for.
+    Hosts arriving after that launch straight away. Each host's result is recorded afterwards, and
+    the start skew of the fire is reported once all of them are in.
+    """
+
+    def __init__(self, parties, timeout=LAUNCH_BARRIER_SECONDS, quorum=None, task_id=None, label="", admission=False):
+        self.parties = parties
+        self.timeout = timeout
+        self.quorum = min(quorum or parties, parties)
+        self.admission = admission
+        self.task_id = task_id
+        self.label = label
+        self.created_at = time.time()
+        self.timed_out = False
+        self._cond = threading.Condition()
+        self._admitted = set()
+        self._ready = set()
+        self._open = timeout <= 0
+        self._deadline = None
+        self._launches = {}
+        self._reported = False
+
+    def _arrive_locked(self, ip):
+        self._ready.add(ip)
+        self._admitted.add(ip)
+        if self._deadline is None:
+            self._deadline = time.monotonic() + self.timeout
+        if len(self._ready) >= self.quorum or (self.admission and self._admitted <= self._ready):
+            self._open = True
+            self._cond.notify_all()
+
+    def admit(self, ip):
+        """ip was given a slot for this fire and is on its way: the barrier waits for it too."""
+        with self._cond:
+            self._admitted.add(ip)
+
+    def wait(self, ip):
+        """Block until the barrier opens; returns the seconds spent waiting."""
+        started = time.monotonic()
+        with self._cond:
+            self._arrive_locked(ip)
+            while not self._open:
+                remaining = self._deadline - time.monotonic()
+                if remaining <= 0:
+                    self._open = True
+                    self.timed_out = True
+                    self._cond.notify_all()
+                    break
+                self._cond.wait(remaining)
+        return time.monotonic() - started
+
+    def withdraw(self, ip):
+        """The host won't launch (unreachable, error...); nobody waits for it. No-op once it arrived."""
+        with self._cond:
+            if ip not in self._ready:
+                self._arrive_locked(ip)
+
+    def record(self, ip, result):
+        with self._cond:
+            self._launches[ip] = result.get("launched_at")
+            complete = len(self._launches) >= self.parties and not self._reported
+            if complete:
+                self._reported = True
+        if complete:
+            report_start_skew(self)
+
+    def launches(self):
+        with self._cond:
+            return {ip: at for ip, at in self._launches.items() if at is not None}
+
+
+_reports = deque(maxlen=MAX_REPORTS)
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def report_start_skew(barrier):
+    launches = barrier.launches()
+    if not launches:
+        return None
+    first, last = min(launches.values()), max(launches.values())
+    skew = last - first
+    START_SKEW.observe(skew)
+    report = {
+        "task_id": barrier.task_id,
+        "label": barrier.label,
+        "hosts": len(launches),
+        "expected": barrier.parties,
+        "skew": round(skew, 4),
+        "first_launch": datetime.fromtimestamp(first).isoformat(),
+        "barrier_timed_out": barrier.timed_out,
+    }
+    _reports.appendleft(report)
+    print(f"⏱ Start skew for {barrier.label or barrier.task_id}: {skew * 1000:.0f} ms across {len(launches)} host(s)")
+    return report
+
+
+def recent_start_skew(task_id=None, limit=50):
+    reports = list(_reports)
+    if task_id is not None:
+        reports = [report for report in reports if report["task_id"] == task_id]
+    return reports[:limit]
+
+
+def shared_barrier(key, parties, **kwargs):
+    """The barrier of key, created on first use: lets separate jobs firing together (one per host) sync up."""
+    now = time.time()
+    with _shared_lock:
+        for stale in [k for k, b in _shared.items() if b._reported or now - b.created_at > SHARED_BARRIER_TTL]:
+            del _shared[stale]
+        barrier = _shared.get(key)
+        if barrier is None:
+            barrier = _shared[key] = LaunchBarrier(parties, **kwargs)
+        return barrier
@@ -0,0 +1,225 @@
+import bisect
+import math
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.forward = None
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        if self.forward is not None:
+            self.forward(self.name, "inc", amount, labels)
+            return
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.forward = None
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        if self.forward is not None:
+            self.forward(self.name, "observe", value, labels)
+            return
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+
+        samples = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                samples.append((f"{self.name}_bucket", labels, cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, key), round(total, 6)))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, key), count))
+        return samples
+
+
+class CallbackMetric:
+    """Gauge or counter whose values are read at scrape time from callback() -> number or {label values: number}."""
+
+    def __init__(self, name, help, callback, labelnames=(), kind="gauge"):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def values(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return {key if isinstance(key, tuple) else (key,): value for key, value in values.items()}
+
+    def samples(self, remote=()):
+        """Samples of this process, with the values reported by other processes (remote) added in."""
+        values = self.values()
+        for other in remote:
+            for key, value in other.items():
+                values[key] = values.get(key, 0) + value
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format (version 0.0.4)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._forward = None
+        self._remote = {}
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            metric.forward = self._forward
+            self._metrics[metric.name] = metric
+            return metric
+
+    def forward_to(self, sink):
+        """
+        Hand counter increments and histogram observations to sink(name, method, value, labels)
+        instead of recording them (used by executor worker processes; see apply()).
+        """
+        with self._lock:
+            self._forward = sink
+            for metric in self._metrics.values():
+                if not isinstance(metric, CallbackMetric):
+                    metric.forward = sink
+
+    def apply(self, name, method, value, labels):
+        """Record an observation forwarded by another process."""
+        with self._lock:
+            metric = self._metrics.get(name)
+        if metric is not None and not isinstance(metric, CallbackMetric):
+            getattr(metric, method)(value, **labels)
+
+    def callback_values(self):
+        """Current values of every callback metric, to be reported to another process's registry."""
+        with self._lock:
+            callbacks = [metric for metric in self._metrics.values() if isinstance(metric, CallbackMetric)]
+        values = {}
+        for metric in callbacks:
+            try:
+                values[metric.name] = metric.values()
+            except Exception:
+                continue
+        return values
+
+    def merge_remote(self, source, values):
+        """Callback metric values of another process (source), added to ours when rendering."""
+        with self._lock:
+            self._remote[source] = values
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, callback, labelnames=(), kind="gauge"):
+        metric = CallbackMetric(name, help, callback, labelnames, kind)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            remote = list(self._remote.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                if isinstance(metric, CallbackMetric):
+                    samples = metric.samples([values[metric.name] for values in remote if metric.name in values])
+                else:
+                    samples = metric.samples()
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+PHASE_SECONDS = metrics.histogram(
+    "hubiwave_phase_seconds",
+    "Time spent per execution phase (precheck, acquire, connect, auth, upload, exec_start, run, kill).",
+    ("phase",),
+)
+EXECUTIONS = metrics.counter("hubiwave_executions_total", "Host executions by final status.", ("status",))
+DISPATCH_WAIT = metrics.histogram(
+    "hubiwave_dispatch_wait_seconds",
+    "Time a host execution waited in the dispatch queue for a session slot.",
+    ("priority",),
+)
+START_SKEW = metrics.histogram(
+    "hubiwave_start_skew_seconds",
+    "Spread between the first and last host launching the command of one scheduled fire.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+SCHEDULER_LAG = metrics.histogram(
+    "hubiwave_scheduler_lag_seconds",
+    "Actual start of a scheduled slot minus its planned fire time.",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60),
+)
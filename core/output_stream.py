@@ -0,0 +1,193 @@
+import codecs
+import select
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from core.tracing import tracer
+
+MAX_RUN_BYTES = 256 * 1024
+MAX_RUNS = 100
+# Runs shared by separate jobs (sequential mode) are closed after this long even if some host never reported.
+SHARED_RUN_TTL = 600
+
+
+class RunOutput:
+    """Bounded ring buffer of output chunks for one run, shared by every host taking part in it."""
+
+    def __init__(self, run_id, task_id=None, label="", max_bytes=MAX_RUN_BYTES, expected=None):
+        self.run_id = run_id
+        self.task_id = task_id
+        self.label = label
+        self.max_bytes = max_bytes
+        # With expected set, the run closes itself once that many hosts have finished.
+        self.expected = expected
+        self.started_at = time.time()
+        self.finished_at = None
+        self.hosts = {}
+        self.dropped = 0
+
+        self._cond = threading.Condition()
+        self._chunks = deque()
+        self._size = 0
+        self._seq = 0
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def _push(self, chunk):
+        self._seq += 1
+        chunk["seq"] = self._seq
+        self._chunks.append(chunk)
+        self._size += len(chunk.get("data", ""))
+        while self._size > self.max_bytes and len(self._chunks) > 1:
+            dropped = self._chunks.popleft()
+            self._size -= len(dropped.get("data", ""))
+            self.dropped += 1
+        self._cond.notify_all()
+
+    def append(self, ip, stream, data):
+        if not data:
+            return
+        with self._cond:
+            self._push({"ip": ip, "stream": stream, "data": data, "ts": time.time()})
+
+    def host_started(self, ip):
+        with self._cond:
+            self.hosts[ip] = {"status": "running", "exit_code": None}
+            self._push({"ip": ip, "stream": "status", "status": "running", "ts": time.time()})
+
+    def host_finished(self, ip, status, exit_code=None):
+        with self._cond:
+            self.hosts[ip] = {"status": status, "exit_code": exit_code}
+            self._push({"ip": ip, "stream": "status", "status": status, "exit_code": exit_code, "ts": time.time()})
+            complete = (
+                self.expected is not None and not self.finished
+                and sum(1 for host in self.hosts.values() if host["status"] != "running") >= self.expected
+            )
+        if complete:
+            self.close()
+
+    def close(self):
+        with self._cond:
+            self.finished_at = time.time()
+            self._cond.notify_all()
+        # The run is the trace: its root span shares the run id.
+        tracer.record(self.run_id, self.label or "run", self.started_at, self.finished_at, span_id=self.run_id,
+                      task_id=self.task_id, hosts=len(self.hosts))
+
+    def wait(self, timeout=None):
+        """Block until the run is closed; returns whether it is."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout)
+
+    def read_since(self, seq, timeout=None):
+        """Return chunks newer than seq, waiting up to timeout for some to arrive."""
+        with self._cond:
+            if self._seq <= seq and not self.finished:
+                self._cond.wait(timeout)
+            return [chunk for chunk in self._chunks if chunk["seq"] > seq], self.finished
+
+    def summary(self):
+        with self._cond:
+            return {
+                "run_id": self.run_id,
+                "task_id": self.task_id,
+                "label": self.label,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "hosts": dict(self.hosts),
+                "buffered_bytes": self._size,
+                "dropped_chunks": self.dropped,
+            }
+
+
+class RunOutputRegistry:
+    def __init__(self, max_runs=MAX_RUNS, max_bytes=MAX_RUN_BYTES):
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._runs = OrderedDict()
+        self._shared = {}
+
+    def create(self, task_id=None, label="", run_id=None, expected=None):
+        run = RunOutput(run_id or uuid.uuid4().hex[:12], task_id, label, self.max_bytes, expected)
+        with self._lock:
+            self._add(run)
+        return run
+
+    def shared(self, key, parties, task_id=None, label=""):
+        """
+        The run of key, created on first use: separate jobs firing together (one per host) report
+        into one run, which closes once all parties have finished.
+        """
+        now = time.time()
+        with self._lock:
+            stale = [k for k, run in self._shared.items() if run.finished or now - run.started_at > SHARED_RUN_TTL]
+            expired = [self._shared.pop(k) for k in stale]
+            run = self._shared.get(key)
+            if run is None:
+                run = self._shared[key] = RunOutput(uuid.uuid4().hex[:12], task_id, label, self.max_bytes, parties)
+                self._add(run)
+        for old in expired:
+            if not old.finished:
+                old.close()
+        return run
+
+    def _add(self, run):
+        self._runs[run.run_id] = run
+        while len(self._runs) > self.max_runs:
+            oldest = next((key for key, r in self._runs.items() if r.finished), None)
+            if oldest is None:
+                break
+            del self._runs[oldest]
+
+    def get(self, run_id):
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def active(self):
+        with self._lock:
+            return sum(1 for run in self._runs.values() if not run.finished)
+
+    def list(self):
+        with self._lock:
+            runs = list(self._runs.values())
+        return [run.summary() for run in reversed(runs)]
+
+
+def drain_channel(channel, run, ip, poll_interval=1.0, eof_grace=1.0):
+    """Forward stdout/stderr into the run buffer until the remote command exits, then return its exit status."""
+    # poll() rather than select(): on large fleets the channel's pipe is easily above fd 1024.
+    poller = select.poll()
+    poller.register(channel, select.POLLIN)
+    decoders = {
+        "stdout": codecs.getincrementaldecoder("utf-8")("replace"),
+        "stderr": codecs.getincrementaldecoder("utf-8")("replace"),
+    }
+
+    exited_at = None
+    while True:
+        if channel.recv_ready():
+            run.append(ip, "stdout", decoders["stdout"].decode(channel.recv(32768)))
+        elif channel.recv_stderr_ready():
+            run.append(ip, "stderr", decoders["stderr"].decode(channel.recv_stderr(32768)))
+        elif channel.eof_received or channel.closed:
+            break
+        elif channel.exit_status_ready():
+            # Output may still trail the exit status: keep reading until EOF, for eof_grace at most.
+            exited_at = exited_at or time.monotonic()
+            if time.monotonic() - exited_at > eof_grace:
+                break
+            poller.poll(50)
+        else:
+            poller.poll(poll_interval * 1000)
+
+    for stream, decoder in decoders.items():
+        run.append(ip, stream, decoder.decode(b"", final=True))
+    return channel.recv_exit_status()
+
+
+runs = RunOutputRegistry()
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from tzlocal import get_localzone
+
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.util import astimezone, datetime_repr
+
+from core.execution_plan import ExecutionPlan
+
+
+class ExecutionPlanTrigger(BaseTrigger):
+    """
+    Fires at every slot of a task's execution plan, computing the next slot on demand.
+
+    One job with this trigger replaces the DateTrigger job per plan entry; fire times are the
+    same ones generate_execution_plan lists, interpreted in the local time zone like DateTrigger.
+
+    :param dict task: task definition the plan is derived from
+    :param datetime.tzinfo|str timezone: time zone of the task's naive datetimes
+    :param float lead: fire this many seconds before each slot instead of at it
+    """
+
+    __slots__ = "plan", "timezone", "lead"
+
+    def __init__(self, task, timezone=None, lead=0):
+        self.plan = ExecutionPlan(task)
+        self.timezone = astimezone(timezone) or get_localzone()
+        self.lead = timedelta(seconds=lead)
+
+    def _localize(self, moment):
+        return moment.replace(tzinfo=self.timezone)
+
+    def _naive(self, moment):
+        return moment.astimezone(self.timezone).replace(tzinfo=None)
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        if previous_fire_time is None:
+            slot = self.plan.first_slot_at_or_after(self._naive(now) + self.lead)
+        else:
+            slot = self.plan.first_slot_after(self._naive(previous_fire_time) + self.lead)
+        if slot >= self.plan.total_slots:
+            return None
+        return self._localize(self.plan.slot_time(slot) - self.lead)
+
+    def __getstate__(self):
+        return {"version": 2, "plan": self.plan, "timezone": self.timezone, "lead": self.lead}
+
+    def __setstate__(self, state):
+        if state.get("version", 1) > 2:
+            raise ValueError(
+                f"Got serialized data for version {state['version']} of "
+                f"{self.__class__.__name__}, but only versions up to 2 can be handled"
+            )
+        self.plan = state["plan"]
+        self.timezone = state["timezone"]
+        self.lead = state.get("lead", timedelta(0))
+
+    def __str__(self):
+        last = self.plan.last_fire_time
+        return f"plan[{self.plan.total_slots} slot(s) until {datetime_repr(self._localize(last)) if last else 'never'}]"
+
+    def __repr__(self):
+        lead = f", lead={self.lead.total_seconds():g}s" if self.lead else ""
+        return f"<{self.__class__.__name__} (slots={self.plan.total_slots}, mode='{self.plan.mode}'{lead})>"
@@ -0,0 +1,279 @@
+import itertools
+import multiprocessing
+import threading
+import time
+import zlib
+
+from config.settings import EXECUTOR_WORKERS
+from core.dispatch import SCHEDULED
+from core.host_registry import registry
+from core.output_stream import runs
+from core.tracing import tracer
+from core.metrics import metrics
+
+WORKER_POLL_SECONDS = 1.0
+# How often a worker reports its gauges (pool, dispatch, upload cache...) to the parent's /metrics.
+WORKER_METRICS_SECONDS = 5.0
+
+
+class _RunProxy:
+    """Stands in for a RunOutput inside a worker: output is forwarded to the parent's run."""
+
+    def __init__(self, run_id, events):
+        self.run_id = run_id
+        self._events = events
+
+    def append(self, ip, stream, data):
+        if data:
+            self._events.put({"op": "run", "run_id": self.run_id, "method": "append", "args": (ip, stream, data)})
+
+    def host_started(self, ip):
+        self._events.put({"op": "run", "run_id": self.run_id, "method": "host_started", "args": (ip,)})
+
+
+def _worker_main(shard, workers, commands, events):
+    # Runs in the child process: everything below has its own SSH pool, deadlines and registry.
+    from core.executor import execute_on_host, stop_task, prewarm_hosts
+    from core.fanout import engine
+    from core.dispatch import dispatcher
+    from core.coalescing import coalescer
+    from core.launch import LaunchBarrier
+    import api.metrics  # noqa: F401 — registers the callback metrics reported below
+
+    tracer.forward_to(lambda span: events.put({"op": "span", "span": span}))
+    metrics.forward_to(lambda name, method, value, labels: events.put(
+        {"op": "metric", "name": name, "method": method, "value": value, "labels": labels}
+    ))
+
+    def report_metrics():
+        while True:
+            events.put({"op": "metrics", "shard": shard, "values": metrics.callback_values()})
+            time.sleep(WORKER_METRICS_SECONDS)
+
+    threading.Thread(target=report_metrics, daemon=True, name=f"shard{shard}-metrics").start()
+    # A host always lands on the same shard, so its per-host cap holds as is; the global cap is split.
+    dispatcher.max_sessions = max(-(-dispatcher.max_sessions // workers), 1)
+
+    def run_batch(message):
+        run = _RunProxy(message["run_id"], events)
+        tickets = {}
+        barrier = None
+        if message.get("barrier") is not None:
+            # The parent's barrier can't cross processes: the hosts of this shard sync up among themselves.
+            barrier = LaunchBarrier(len(message["ips"]), message["barrier"], admission=True)
+
+        def admit(ip):
+            tickets[ip] = coalescer.request(ip, message["priority"])
+            return tickets[ip]
+
+        def execute(ip):
+            if barrier is not None:
+                barrier.admit(ip)
+            try:
+                result = execute_on_host(message["task"], ip, run, host=message["hosts"].get(ip), label=message["label"],
+                                         session=tickets[ip].session, barrier=barrier)
+            except Exception as e:
+                result = {"ip": ip, "status": "error", "exit_code": None, "error": str(e)}
+            events.put({"op": "result", "call_id": message["call_id"], "ip": ip, "result": result})
+
+        engine.map(execute, message["ips"], admit=admit)
+
+    def stop(message):
+        try:
+            results = stop_task(message["task_id"])
+        except Exception as e:
+            results = [{"killed": False, "error": str(e)}]
+        events.put({"op": "stopped", "call_id": message["call_id"], "results": results})
+
+    def prewarm(message):
+        prewarm_hosts(message["ips"], hosts=message["hosts"])
+
+    handlers = {"run": run_batch, "stop": stop, "prewarm": prewarm}
+    while True:
+        message = commands.get()
+        if message is None:
+            return
+        threading.Thread(target=handlers[message["op"]], args=(message,), daemon=True,
+                         name=f"shard{shard}-{message['op']}").start()
+
+
+class _Call:
+    def __init__(self, ips=(), on_result=None):
+        self.pending = set(ips)
+        self.results = {}
+        self.on_result = on_result
+        self.stopped = None
+        self.done = threading.Event()
+
+
+class ShardedProcessExecutor:
+    """
+    Spreads hosts over long-lived worker processes so SSH handshakes and ciphers use more than one core.
+
+    A host always goes to the same worker (its shard), which keeps its connections warm in that
+    worker's pool. Workers stream output back into the parent's runs and return one result per
+    host; logging and run bookkeeping stay in the parent.
+    """
+
+    def __init__(self, workers=EXECUTOR_WORKERS):
+        self.workers = max(int(workers), 1)
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = [None] * self.workers
+        self._commands = [None] * self.workers
+        self._events = None
+        self._calls = {}
+        self._call_ids = itertools.count()
+        self._dispatched = [0] * self.workers
+        self._restarts = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._events is None:
+                self._events = self._context.Queue()
+                threading.Thread(target=self._listen, daemon=True, name="shard-listener").start()
+            for shard in range(self.workers):
+                process = self._processes[shard]
+                if process is not None and process.is_alive():
+                    continue
+                if process is not None:
+                    self._restarts += 1
+                    print(f"⚠️ [Executor] Worker {shard} exited (code {process.exitcode}) — restarting")
+                self._commands[shard] = self._context.Queue()
+                process = self._context.Process(
+                    target=_worker_main, args=(shard, self.workers, self._commands[shard], self._events),
+                    daemon=True, name=f"executor-shard-{shard}",
+                )
+                process.start()
+                self._processes[shard] = process
+
+    def _listen(self):
+        while True:
+            event = self._events.get()
+            try:
+                if event["op"] == "run":
+                    run = runs.get(event["run_id"])
+                    if run is not None:
+                        getattr(run, event["method"])(*event["args"])
+                    continue
+                if event["op"] == "span":
+                    tracer.add(event["span"])
+                    continue
+                if event["op"] == "metric":
+                    metrics.apply(event["name"], event["method"], event["value"], event["labels"])
+                    continue
+                if event["op"] == "metrics":
+                    metrics.merge_remote(f"shard{event['shard']}", event["values"])
+                    continue
+
+                with self._lock:
+                    call = self._calls.get(event["call_id"])
+                if call is None:
+                    continue
+                if event["op"] == "result":
+                    call.results[event["ip"]] = event["result"]
+                    call.pending.discard(event["ip"])
+                    if call.on_result:
+                        call.on_result(event["ip"], event["result"])
+                    if not call.pending:
+                        call.done.set()
+                elif event["op"] == "stopped":
+                    call.stopped = event["results"]
+                    call.done.set()
+            except Exception as e:
+                print(f"❌ [Executor] Failed to handle worker event: {e}")
+
+    def shard_of(self, ip):
+        return zlib.crc32(ip.encode()) % self.workers
+
+    def _send(self, shard, message, call):
+        call_id = next(self._call_ids)
+        message["call_id"] = call_id
+        with self._lock:
+            self._calls[call_id] = call
+            self._dispatched[shard] += 1
+        self._commands[shard].put(message)
+        return call_id
+
+    def _wait(self, shard, call_id, call):
+        while not call.done.wait(WORKER_POLL_SECONDS):
+            if not self._processes[shard].is_alive():
+                for ip in list(call.pending):
+                    result = {"ip": ip, "status": "error", "exit_code": None, "error": "executor worker exited"}
+                    call.results[ip] = result
+                    if call.on_result:
+                        call.on_result(ip, result)
+                call.pending.clear()
+                break
+        with self._lock:
+            self._calls.pop(call_id, None)
+
+    def _by_shard(self, ips):
+        by_shard = {}
+        for ip in ips:
+            by_shard.setdefault(self.shard_of(ip), []).append(ip)
+        return by_shard
+
+    def execute(self, task, ips, run, label="", on_result=None, priority=SCHEDULED, barrier=None):
+        """
+        Run task on every ip across the shards and return {ip: result}; on_result(ip, result) fires as hosts finish.
+
+        With a barrier, the hosts of each shard launch together (within its timeout).
+        """
+        self._ensure_started()
+        sent = []
+        for shard, shard_ips in self._by_shard(ips).items():
+            call = _Call(shard_ips, on_result)
+            message = {
+                "op": "run",
+                "task": task,
+                "ips": shard_ips,
+                "hosts": {ip: registry.by_ip(ip) for ip in shard_ips},
+                "run_id": run.run_id,
+                "label": label,
+                "priority": priority,
+                "barrier": barrier.timeout if barrier is not None else None,
+            }
+            sent.append((shard, self._send(shard, message, call), call))
+
+        results = {}
+        for shard, call_id, call in sent:
+            self._wait(shard, call_id, call)
+            results.update(call.results)
+        return {ip: results[ip] for ip in ips}
+
+    def prewarm(self, ips):
+        """Have each host's worker connect to it ahead of time; doesn't wait for the connections."""
+        self._ensure_started()
+        for shard, shard_ips in self._by_shard(ips).items():
+            self._commands[shard].put({"op": "prewarm", "ips": shard_ips,
+                                       "hosts": {ip: registry.by_ip(ip) for ip in shard_ips}})
+
+    def stop_task(self, task_id):
+        """Ask every worker to stop the task's processes it launched; returns the per-host outcomes."""
+        with self._lock:
+            started = self._events is not None
+        if not started:
+            return []
+
+        sent = [(shard, self._send(shard, {"op": "stop", "task_id": task_id}, call), call)
+                for shard, call in ((shard, _Call()) for shard in range(self.workers))]
+        outcomes = []
+        for shard, call_id, call in sent:
+            self._wait(shard, call_id, call)
+            outcomes.extend(call.stopped or [])
+        return outcomes
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "alive": sum(1 for p in self._processes if p is not None and p.is_alive()),
+                "pids": [p.pid if p is not None else None for p in self._processes],
+                "dispatched": list(self._dispatched),
+                "in_flight": len(self._calls),
+                "restarts": self._restarts,
+            }
+
+
+sharded_executor = ShardedProcessExecutor()
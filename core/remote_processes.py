@@ -0,0 +1,159 @@
+import itertools
+import shlex
+import threading
+import time
+
+from core.ssh_service import pool
+from core.metrics import PHASE_SECONDS
+
+# Detached processes are checked for on their host this often, and only once they're this old.
+SWEEP_INTERVAL = 60
+SWEEP_MIN_AGE = 10
+# How long a kill or sweep waits for a pooled connection to the host; past that it fails like an unreachable host.
+POOL_WAIT_SECONDS = 15
+
+
+def kill_command(pid_file):
+    """Kill the process group recorded in pid_file in a single remote round trip."""
+    quoted = shlex.quote(pid_file)
+    return (
+        f"pid=$(cat {quoted} 2>/dev/null); "
+        f'if [ -n "$pid" ] && kill -0 "$pid" 2>/dev/null; then '
+        f'kill -TERM -- -"$pid" 2>/dev/null || pkill -TERM -P "$pid"; '
+        f'sleep 0.5; kill -KILL -- -"$pid" 2>/dev/null; kill -KILL "$pid" 2>/dev/null; '
+        f'rm -f {quoted}; echo "pid $pid"; '
+        f'else rm -f {quoted}; echo not_running; fi'
+    )
+
+
+def running_command(pid_files):
+    """Print those of pid_files whose process is still running and remove the others, in one round trip."""
+    return "; ".join(
+        f'pid=$(cat {quoted} 2>/dev/null); '
+        f'if [ -n "$pid" ] && kill -0 "$pid" 2>/dev/null; then echo {quoted}; else rm -f {quoted}; fi'
+        for quoted in map(shlex.quote, pid_files)
+    )
+
+
+class RemoteProcess:
+    def __init__(self, key, task_id, ip, user, port, pid_file, client=None):
+        self.key = key
+        self.task_id = task_id
+        self.ip = ip
+        self.user = user
+        self.port = port
+        self.pid_file = pid_file
+        self.client = client
+        self.started_at = time.time()
+        self.deadline = None
+        self.stopped = False
+        # (trace id, parent span id) of the host execution that launched it
+        self.trace = None
+
+
+class RemoteProcessRegistry:
+    """
+    Tracks launched remote processes per task so they can be stopped over the session that started them.
+
+    Foreground processes are unregistered when they exit. Detached ones (registered without a
+    client) are swept: a background thread checks their pid files host by host and forgets
+    those that are no longer running.
+    """
+
+    def __init__(self, sweep_interval=SWEEP_INTERVAL):
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._by_task = {}
+        self._sweeper = None
+
+    def register(self, task_id, ip, user, port, pid_file, client=None):
+        process = RemoteProcess(next(self._counter), task_id, ip, user, port, pid_file, client)
+        with self._lock:
+            self._by_task.setdefault(task_id, {})[process.key] = process
+            if client is None and (self._sweeper is None or not self._sweeper.is_alive()):
+                self._sweeper = threading.Thread(target=self._sweep_forever, daemon=True, name="process-sweeper")
+                self._sweeper.start()
+        return process
+
+    def unregister(self, process):
+        with self._lock:
+            processes = self._by_task.get(process.task_id, {})
+            processes.pop(process.key, None)
+            if not processes:
+                self._by_task.pop(process.task_id, None)
+
+    def for_task(self, task_id):
+        with self._lock:
+            return list(self._by_task.get(task_id, {}).values())
+
+    def count(self):
+        with self._lock:
+            return sum(len(processes) for processes in self._by_task.values())
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ [Processes] Sweep failed: {e}")
+
+    def sweep(self):
+        """Forget the detached processes that have exited; returns how many were forgotten."""
+        cutoff = time.time() - SWEEP_MIN_AGE
+        by_host = {}
+        with self._lock:
+            for processes in self._by_task.values():
+                for process in processes.values():
+                    if process.client is None and process.started_at < cutoff:
+                        by_host.setdefault((process.ip, process.user, process.port), []).append(process)
+
+        forgotten = 0
+        for (ip, user, port), detached in by_host.items():
+            try:
+                with pool.connection(ip, user, port, wait_timeout=POOL_WAIT_SECONDS) as ssh:
+                    stdin, stdout, stderr = ssh.exec_command(running_command([p.pid_file for p in detached]), timeout=15)
+                    running = set(stdout.read().decode().split())
+            except Exception:
+                # Unreachable for now: keep them, a stop may still get through later.
+                continue
+            for process in detached:
+                if process.pid_file not in running:
+                    if process.deadline is not None:
+                        process.deadline.cancel()
+                    self.unregister(process)
+                    forgotten += 1
+        return forgotten
+
+
+def kill_process(ip, user, port, pid_file, client=None):
+    command = kill_command(pid_file)
+    started = time.time()
+
+    def run(ssh):
+        stdin, stdout, stderr = ssh.exec_command(command, timeout=15)
+        output = stdout.read().decode().strip()
+        return stdout.channel.recv_exit_status(), output
+
+    transport = client.get_transport() if client else None
+    if transport is not None and transport.is_active():
+        exit_code, output = run(client)
+        via = "session"
+    else:
+        with pool.connection(ip, user, port, wait_timeout=POOL_WAIT_SECONDS) as ssh:
+            exit_code, output = run(ssh)
+        via = "pool"
+
+    PHASE_SECONDS.observe(time.time() - started, phase="kill")
+    return {
+        "ip": ip,
+        "killed": output.startswith("pid"),
+        "method": output.split()[0] if output else "none",
+        "via": via,
+        "exit_code": exit_code,
+        "seconds": round(time.time() - started, 3),
+    }
+
+
+processes = RemoteProcessRegistry()
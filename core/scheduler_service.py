@@ -1,47 +1,52 @@
+import hashlib
 import json
+import threading
+import time
 import uuid
+import weakref
 from datetime import datetime, timedelta
-from pathlib import Path
 
-from apscheduler.triggers.date import DateTrigger
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.background import BackgroundScheduler
 
-SCHEDULE_FILE = Path("modules/scheduler/data/scheduled_events.json")
+from core.execution_plan import ExecutionPlan
+from core.plan_trigger import ExecutionPlanTrigger
+from core.executor import prewarm_hosts
+from core.launch import shared_barrier
+from core.output_stream import runs
+from core.dispatch import dispatcher
+from core.task_store import store
+from core.host_registry import registry
+from core.jobstore import SqliteJobStore
+from core.metrics import SCHEDULER_LAG
+from config.settings import (
+    JOBSTORE_DB_PATH, SCHEDULER_MISFIRE_GRACE, SCHEDULER_COALESCE, SCHEDULER_THREADS, PREWARM_LEAD_SECONDS
+)
+
+# Fingerprint of every task currently planned on a scheduler, used to reschedule only what changed.
+_scheduled_fingerprints = weakref.WeakKeyDictionary()
+# Startup, the file watcher and store listeners may all ask for a reschedule at once.
+_reschedule_lock = threading.Lock()
+# Background revalidation thread of each warm-started scheduler.
+_revalidations = weakref.WeakKeyDictionary()
 
 def load_tasks():
-    if not SCHEDULE_FILE.exists():
-        return []
-    with SCHEDULE_FILE.open("r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
+    return store.all()
 
 def save_tasks(tasks):
-    with SCHEDULE_FILE.open("w") as f:
-        json.dump(tasks, f, indent=2)
+    store.replace_all(tasks)
 
 def save_task(new_task):
-    tasks = load_tasks()
-    tasks.append(new_task)
-    save_tasks(tasks)
+    store.add(new_task)
 
 def delete_task(task_id):
-    tasks = load_tasks()
-    tasks = [task for task in tasks if task.get("id") != task_id]
-    save_tasks(tasks)
+    store.delete(task_id)
 
 def update_task(task_id, updates):
-    tasks = load_tasks()
-    for task in tasks:
-        if task.get("id") == task_id:
-            task.update(updates)
-            break
-    save_tasks(tasks)
+    store.update(task_id, updates)
 
 def find_task_by_id(task_id):
-    tasks = load_tasks()
-    return next((task for task in tasks if task.get("id") == task_id), None)
+    return store.get(task_id)
 
 def generate_task_id():
     return str(uuid.uuid4())
@@ -55,7 +60,7 @@ def convert_to_seconds(value, unit):
     }
     return value * units.get(unit, 1)
 
-def calculate_schedule_metadata(start, end, total_cycles, executions_per_cycle, spacing, cycle_every, unit, mode):
+def calculate_schedule_metadata(start, end, total_cycles, executions_per_cycle, spacing, cycle_every, unit, mode, waves=1):
     try:
         start_dt = datetime.fromisoformat(start)
         end_dt = datetime.fromisoformat(end)
@@ -69,6 +74,10 @@ def calculate_schedule_metadata(start, end, total_cycles, executions_per_cycle,
         total_spacing = (executions_per_cycle - 1) * spacing
         timeout = max((raw_duration - total_spacing) / executions_per_cycle, 0)
         cycle_duration = timeout * executions_per_cycle + total_spacing
+    elif mode == "rolling":
+        # The cycle window is shared by the waves; each one may use its slice of it.
+        timeout = raw_duration / max(waves, 1)
+        cycle_duration = raw_duration
     else:
         timeout = raw_duration
         cycle_duration = raw_duration
@@ -86,118 +95,131 @@ def calculate_schedule_metadata(start, end, total_cycles, executions_per_cycle,
 
 
 def generate_execution_plan(task):
-    start_time = datetime.fromisoformat(task["start_datetime"])
-    executions_per_cycle = int(task.get("executions_per_cycle", 1))
-    total_cycles = int(task.get("total_cycles", 1))
-    execution_spacing = int(task.get("execution_spacing", 0))
-    cycle_every = int(task.get("cycle_every", 0))
-    cycle_unit = task.get("cycle_unit", "minutes")
-    timeout = int(task.get("timeout", 0))
-    execution_mode = task.get("execution_mode", "parallel")
-    machines = task.get("machines", [])
-
-    plan = []
-
-    spacing_delta = timedelta(seconds=execution_spacing)
-    timeout_delta = timedelta(seconds=timeout)
-
-    if cycle_unit == "seconds":
-        cycle_delta = timedelta(seconds=cycle_every)
-    elif cycle_unit == "minutes":
-        cycle_delta = timedelta(minutes=cycle_every)
-    elif cycle_unit == "hours":
-        cycle_delta = timedelta(hours=cycle_every)
-    else:
-        cycle_delta = timedelta(minutes=cycle_every)
-
-    current_time = start_time
-
-    for cycle_index in range(total_cycles):
-        if execution_mode == "parallel":
-            plan.append({
-                "cycle": cycle_index + 1,
-                "ips": machines,
-                "time": current_time.isoformat()
-            })
-            current_time += timeout_delta + cycle_delta
-
-        elif execution_mode == "sequential":
-            for exec_index in range(executions_per_cycle):
-                for ip in machines:
-                    plan.append({
-                        "cycle": cycle_index + 1,
-                        "execution": exec_index + 1,
-                        "ip": ip,
-                        "time": current_time.isoformat()
-                    })
-                
-                if exec_index < executions_per_cycle - 1:
-                    current_time += timeout_delta + spacing_delta
-                else:
-                    current_time += timeout_delta
-            current_time += cycle_delta
-
-    return plan
-
-
-def schedule_task(task, scheduler, run_callback):
+    return list(ExecutionPlan(task))
+
+
+def task_fingerprint(task):
+    return hashlib.sha256(json.dumps(task, sort_keys=True, default=str).encode()).hexdigest()
+
+def jobs_by_task(scheduler):
+    grouped = {}
+    for job in scheduler.get_jobs():
+        grouped.setdefault(job.id.split("_", 1)[0], []).append(job.id)
+    return grouped
+
+def run_planned_slot(run_callback, task, ip=None):
+    """Job function of an ExecutionPlanTrigger job: run whatever the plan has due at this fire time."""
+    plan = ExecutionPlan(task)
+    now = datetime.now()
+    for slot in plan.slots_firing_at(now):
+        cycle, execution = divmod(slot, plan.executions)
+        SCHEDULER_LAG.observe(max((now - plan.slot_time(slot)).total_seconds(), 0))
+        if ip is None:
+            run_callback(task, plan.machines, cycle + 1)
+        else:
+            # Every host has its own job firing at the slot; they meet at one barrier to launch together.
+            # No more of them than the scheduler has threads (or dispatch admits) can be waiting there at once.
+            label = f"{task.get('name') or task['id']} cycle {cycle + 1} execution {execution + 1}"
+            barrier = shared_barrier(
+                (task["id"], slot), len(plan.machines), task_id=task["id"],
+                quorum=min(SCHEDULER_THREADS, dispatcher.max_sessions), label=label
+            )
+            # Their output goes to one run for the slot, as a parallel cycle's does.
+            run = runs.shared((task["id"], slot), len(plan.machines), task_id=task["id"], label=label)
+            run_callback(
+                task,
+                ip,
+                execution,
+                task.get("executions_per_cycle", 1),
+                task.get("execution_spacing", 0),
+                run=run,
+                barrier=barrier
+            )
+
+def prewarm_planned_slot(task):
+    """Job function of the prewarm job: connect to the task's hosts ahead of its next slot."""
+    prewarm_hosts(ExecutionPlan(task).machines)
+
+def schedule_task(task, scheduler, run_callback, existing_job_ids=None):
     try:
-        plan = generate_execution_plan(task)
+        plan = ExecutionPlan(task)
     except Exception as e:
         print(f"❌ Task planning failed: {e}")
-        return
-
-    existing_job_ids = {job.id for job in scheduler.get_jobs()}
-    newly_scheduled = set()
-
-    execution_mode = task.get("execution_mode", "parallel")
+        return 0
 
-    for item in plan:
-        if execution_mode == "parallel":
-            job_id = f"{task['id']}_cycle{item['cycle']}"
-            run_at = datetime.fromisoformat(item["time"])
-
-            if job_id in existing_job_ids or job_id in newly_scheduled:
-                print(f"⚠️ Job already scheduled: {job_id} — skipping.")
-                continue
+    # A job without a next fire time would be stored paused and never run: nothing left to schedule.
+    if plan.next_fire_time() is None:
+        return 0
 
-            scheduler.add_job(
-                func=run_callback,
-                trigger=DateTrigger(run_date=run_at),
-                args=[task, item["ips"], item["cycle"]],
-                id=job_id,
-                name=f"{task.get('name')} — Cycle {item['cycle']}",
-                replace_existing=False
-            )
-
-        else:  # sequential
-            job_id = f"{task['id']}_{item['ip'].replace('.', '-')}_c{item['cycle']}_e{item['execution']}"
-            run_at = datetime.fromisoformat(item["time"])
-
-            if job_id in existing_job_ids or job_id in newly_scheduled:
-                print(f"⚠️ Job already scheduled: {job_id} — skipping.")
-                continue
+    if existing_job_ids is None:
+        existing_job_ids = {job.id for job in scheduler.get_jobs()}
+    newly_scheduled = set()
 
-            scheduler.add_job(
-                func=run_callback,
-                trigger=DateTrigger(run_date=run_at),
-                args=[
-                    task,
-                    item["ip"],
-                    item["execution"] - 1,
-                    task.get("executions_per_cycle", 1),
-                    task.get("execution_spacing", 0)
-                ],
-                id=job_id,
-                name=f"{task.get('name')} @ {item['ip']} [C{item['cycle']} E{item['execution']}]",
-                replace_existing=False
-            )
+    # One job per task (parallel, rolling) or per host (sequential); the trigger walks the plan slot by slot.
+    if plan.mode == "parallel":
+        jobs = [(f"{task['id']}_plan", None, f"{task.get('name')} — {plan.total_slots} cycle(s)")]
+    elif plan.mode == "rolling":
+        jobs = [(f"{task['id']}_plan", None, f"{task.get('name')} — {plan.total_slots} cycle(s) in {len(plan.waves)} wave(s)")]
+    else:
+        jobs = [
+            (f"{task['id']}_{ip.replace('.', '-')}_plan", ip, f"{task.get('name')} @ {ip} [{plan.total_slots} execution(s)]")
+            for ip in plan.machines
+        ]
+
+    for job_id, ip, name in jobs:
+        if job_id in existing_job_ids or job_id in newly_scheduled:
+            print(f"⚠️ Job already scheduled: {job_id} — skipping.")
+            continue
 
+        scheduler.add_job(
+            func=run_planned_slot,
+            trigger=ExecutionPlanTrigger(task),
+            args=[run_callback, task, ip],
+            id=job_id,
+            name=name,
+            # A slot may still be draining when the next one fires, as separate jobs used to allow.
+            max_instances=3,
+            replace_existing=False
+        )
         newly_scheduled.add(job_id)
-        print(f"📆 Scheduled: {job_id} at {run_at.isoformat()}")
-
+        print(f"📆 Scheduled: {job_id} — {plan.total_slots} slot(s) from {plan.start.isoformat()} to {plan.last_fire_time.isoformat()}")
+
+    # Connections are opened PREWARM_LEAD_SECONDS ahead of every slot so the fire itself finds them warm.
+    prewarm_id = f"{task['id']}_prewarm"
+    prewarm = ExecutionPlanTrigger(task, lead=PREWARM_LEAD_SECONDS)
+    if (PREWARM_LEAD_SECONDS > 0 and prewarm_id not in existing_job_ids and prewarm_id not in newly_scheduled
+            and prewarm.get_next_fire_time(None, datetime.now(prewarm.timezone)) is not None):
+        scheduler.add_job(
+            func=prewarm_planned_slot,
+            trigger=prewarm,
+            args=[task],
+            id=prewarm_id,
+            name=f"{task.get('name')} — pre-warm {PREWARM_LEAD_SECONDS:g}s ahead",
+            replace_existing=False
+        )
+        newly_scheduled.add(prewarm_id)
+
+    return len(newly_scheduled)
+
+
+def persisted_fingerprints(scheduler):
+    """Fingerprints of the tasks behind plan jobs already in the jobstore (e.g. restored after a restart)."""
+    fingerprints = {}
+    for job in scheduler.get_jobs():
+        if job.func is run_planned_slot and len(job.args) > 1:
+            fingerprints.setdefault(job.args[1].get("id"), task_fingerprint(job.args[1]))
+    return fingerprints
+
+def validate_and_schedule_tasks(scheduler, run_callback, hosts=None):
+    with _reschedule_lock:
+        _validate_and_schedule_tasks(scheduler, run_callback, hosts)
+
+def _validate_and_schedule_tasks(scheduler, run_callback, hosts=None):
+    if hosts is None:
+        host_by_ip = registry.by_ip
+    else:
+        host_by_ip = {host.get("ip"): host for host in hosts}.get
 
-def validate_and_schedule_tasks(scheduler, run_callback, hosts):
     tasks = load_tasks()
     now = datetime.utcnow()
     valid_tasks = []
@@ -212,19 +234,18 @@ def validate_and_schedule_tasks(scheduler, run_callback, hosts):
         task_macs = task.get("macs", {})
         valid_machines = []
 
-        for host in hosts:
-            ip = host.get("ip")
+        for ip in task["machines"]:
+            host = host_by_ip(ip)
+            if host is None:
+                print(f"🚫 {ip} is not a registered host")
+                continue
             mac = host.get("id")
-            print(f"🔧 Checking: IP={ip}, MAC={mac}")
-            if ip in task["machines"]:
-                expected_mac = task_macs.get(ip)
-                if expected_mac == mac:
-                    print(f"✅ Machine OK: {ip}")
-                    valid_machines.append(ip)
-                else:
-                    print(f"❌ MAC mismatch for {ip}: expected {expected_mac}, got {mac}")
+            expected_mac = task_macs.get(ip)
+            if expected_mac == mac:
+                print(f"✅ Machine OK: {ip}")
+                valid_machines.append(ip)
             else:
-                print(f"🚫 {ip} not in the task machine list")
+                print(f"❌ MAC mismatch for {ip}: expected {expected_mac}, got {mac}")
 
         if not valid_machines:
             print(f"❌ No valid machine found for task {task['name']}")
@@ -240,13 +261,77 @@ def validate_and_schedule_tasks(scheduler, run_callback, hosts):
         valid_tasks.append(task)
 
     print(f"🔁 Re-scheduling {len(valid_tasks)} task(s)...")
-    scheduler.remove_all_jobs()
-
-    for task in valid_tasks:
-        schedule_task(task, scheduler, run_callback)
+    previous = _scheduled_fingerprints.get(scheduler)
+    if previous is None:
+        previous = persisted_fingerprints(scheduler)
+    current = {task["id"]: task_fingerprint(task) for task in valid_tasks}
+    job_ids = jobs_by_task(scheduler)
+
+    stale = [task_id for task_id in set(previous) | set(job_ids) if task_id not in current]
+    changed = [task for task in valid_tasks if previous.get(task["id"]) != current[task["id"]]]
+
+    removed_jobs = 0
+    for task_id in stale + [task["id"] for task in changed]:
+        for job_id in job_ids.get(task_id, []):
+            scheduler.remove_job(job_id)
+            removed_jobs += 1
+
+    added_jobs = 0
+    for task in changed:
+        added_jobs += schedule_task(task, scheduler, run_callback, existing_job_ids=set())
+
+    _scheduled_fingerprints[scheduler] = current
+    print(
+        f"🔁 Reschedule diff: {len(changed)} task(s) added/changed, {len(stale)} removed, "
+        f"{len(valid_tasks) - len(changed)} unchanged — {removed_jobs} job(s) removed, {added_jobs} added"
+    )
+
+def create_scheduler(jobstore=None):
+    job_defaults = {
+        "misfire_grace_time": SCHEDULER_MISFIRE_GRACE,
+        "coalesce": SCHEDULER_COALESCE,
+    }
+    jobstores = {"default": jobstore} if jobstore is not None else {}
+    executors = {"default": ThreadPoolExecutor(SCHEDULER_THREADS)}
+    return BackgroundScheduler(jobstores=jobstores, executors=executors, job_defaults=job_defaults)
+
+def wait_until_validated(scheduler, timeout=None):
+    """Block until the background revalidation of a warm start is over; True if it finished."""
+    thread = _revalidations.get(scheduler)
+    if thread is None:
+        return True
+    thread.join(timeout)
+    return not thread.is_alive()
+
+def start_scheduler(run_callback, hosts=None, jobstore_path=JOBSTORE_DB_PATH):
+    """
+    Start the scheduler, resuming persisted jobs straight away when there are any.
+
+    Cold start (empty or in-memory jobstore): tasks are validated and planned before the scheduler runs.
+    Warm start: the restored jobs run immediately and validation happens in the background, where the
+    fingerprint diff only touches tasks or hosts that changed while the app was down.
+    """
+    started = time.perf_counter()
+    jobstore = SqliteJobStore(jobstore_path) if jobstore_path else None
+    scheduler = create_scheduler(jobstore)
+    warm = jobstore is not None and jobstore.count() > 0
+
+    if not warm:
+        validate_and_schedule_tasks(scheduler, run_callback, hosts)
+        scheduler.start()
+        print(f"🚀 [Scheduler] Cold start in {time.perf_counter() - started:.3f}s")
+        return scheduler
 
-def start_scheduler(run_callback, hosts):
-    scheduler = BackgroundScheduler()
-    validate_and_schedule_tasks(scheduler, run_callback, hosts)
     scheduler.start()
+    print(f"🚀 [Scheduler] Warm start: resumed {jobstore.count()} persisted job(s) in {time.perf_counter() - started:.3f}s")
+
+    def revalidate():
+        try:
+            validate_and_schedule_tasks(scheduler, run_callback, hosts)
+        except Exception as e:
+            print(f"❌ [Scheduler] Background revalidation failed: {e}")
+
+    thread = threading.Thread(target=revalidate, daemon=True, name="scheduler-revalidate")
+    _revalidations[scheduler] = thread
+    thread.start()
     return scheduler
@@ -0,0 +1,261 @@
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+import paramiko
+import socket
+
+from core.metrics import PHASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class SSHConnectionPool:
+    """
+    Keeps authenticated SSH clients alive per (ip, port, user, key) and hands them out as exclusive leases.
+
+    At most max_total connections are open at once (idle ones are closed to make room); a
+    background reaper closes connections idle for longer than idle_timeout. Health checks and
+    closes happen outside the pool lock, so a slow host never holds up the others.
+    """
+
+    def __init__(self, key_path, key_loader, max_per_host=4, idle_timeout=300,
+                 keepalive_interval=30, connect_timeout=5, max_total=None, reap_interval=30):
+        self.key_path = key_path
+        self.key_loader = key_loader
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.connect_timeout = connect_timeout
+        self.max_total = max_total
+        self.reap_interval = reap_interval
+
+        self._cond = threading.Condition()
+        self._idle = {}
+        self._in_use = {}
+        self._leases = {}
+        self._pkeys = {}
+        self._reaper = None
+        self._counters = {"created": 0, "reused": 0, "evicted": 0, "discarded": 0, "failed": 0}
+
+    def _key(self, ip, user, port, key_path=None):
+        return (ip, int(port), user, key_path or self.key_path)
+
+    @staticmethod
+    def _is_healthy(client):
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            transport.send_ignore()
+        except Exception:
+            return False
+        return True
+
+    def private_key(self, key_path=None):
+        key_path = key_path or self.key_path
+        with self._cond:
+            pkey = self._pkeys.get(key_path)
+        if pkey is None:
+            pkey = self.key_loader(key_path)
+            if pkey is not None:
+                with self._cond:
+                    self._pkeys[key_path] = pkey
+        return pkey
+
+    def _connect(self, ip, user, port, key_path, connect_timeout):
+        pkey = self.private_key(key_path)
+        if pkey is None:
+            raise paramiko.SSHException(f"Private key unavailable: {key_path or self.key_path}")
+
+        timeout = connect_timeout or self.connect_timeout
+        started = time.time()
+        sock = socket.create_connection((ip, port), timeout=timeout)
+        connected = time.time()
+        PHASE_SECONDS.observe(connected - started, phase="connect")
+
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(hostname=ip, port=port, username=user, pkey=pkey, timeout=timeout, sock=sock)
+        except Exception:
+            sock.close()
+            raise
+        PHASE_SECONDS.observe(time.time() - connected, phase="auth")
+        client.get_transport().set_keepalive(self.keepalive_interval)
+        return client
+
+    def _close(self, client):
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    def _total_locked(self):
+        return sum(self._in_use.values()) + sum(len(idle) for idle in self._idle.values())
+
+    def _evict_idle_locked(self, now):
+        """Take the connections idle for too long out of the pool; the caller closes them unlocked."""
+        expired = []
+        for key, idle in list(self._idle.items()):
+            keep = []
+            for client, last_used in idle:
+                if now - last_used > self.idle_timeout:
+                    expired.append(client)
+                else:
+                    keep.append((client, last_used))
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+        self._counters["evicted"] += len(expired)
+        return expired
+
+    def _evict_oldest_locked(self):
+        """Take the least recently used idle connection out of the pool to make room under max_total."""
+        oldest = None
+        for key, idle in self._idle.items():
+            for index, (_, last_used) in enumerate(idle):
+                if oldest is None or last_used < oldest[2]:
+                    oldest = (key, index, last_used)
+        if oldest is None:
+            return None
+        key, index, _ = oldest
+        client, _ = self._idle[key].pop(index)
+        if not self._idle[key]:
+            del self._idle[key]
+        self._counters["evicted"] += 1
+        return client
+
+    def _ensure_reaper(self):
+        if self._reaper is None or not self._reaper.is_alive():
+            self._reaper = threading.Thread(target=self._reap, daemon=True, name="ssh-pool-reaper")
+            self._reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(self.reap_interval)
+            self.evict_idle()
+
+    def _lease_locked(self, key, client):
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        self._leases[client] = key
+
+    def _unlease_locked(self, key, client=None):
+        self._in_use[key] = max(self._in_use.get(key, 0) - 1, 0)
+        if not self._in_use[key]:
+            del self._in_use[key]
+        if client is not None:
+            self._leases.pop(client, None)
+        self._cond.notify_all()
+
+    def acquire(self, ip, user, port=22, key_path=None, connect_timeout=None, wait_timeout=None):
+        key = self._key(ip, user, port, key_path)
+        deadline = None if wait_timeout is None else time.time() + wait_timeout
+
+        while True:
+            to_close = []
+            candidate = None
+            with self._cond:
+                self._ensure_reaper()
+                to_close += self._evict_idle_locked(time.time())
+                while True:
+                    idle = self._idle.get(key)
+                    if idle:
+                        candidate, _ = idle.pop()
+                        if not idle:
+                            del self._idle[key]
+                        self._lease_locked(key, candidate)
+                        break
+
+                    if self._in_use.get(key, 0) < self.max_per_host:
+                        if self.max_total is None or self._total_locked() < self.max_total:
+                            self._in_use[key] = self._in_use.get(key, 0) + 1
+                            break
+                        evicted = self._evict_oldest_locked()
+                        if evicted is not None:
+                            to_close.append(evicted)
+                            continue
+
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        for client in to_close:
+                            self._close(client)
+                        raise TimeoutError(f"No SSH connection slot available for {ip}:{port}")
+                    self._cond.wait(timeout=remaining)
+
+            for client in to_close:
+                self._close(client)
+            if candidate is None:
+                break
+            # The idle connection is leased before it's checked, so the check runs without the lock.
+            if self._is_healthy(candidate):
+                with self._cond:
+                    self._counters["reused"] += 1
+                return candidate
+            self._close(candidate)
+            with self._cond:
+                self._counters["discarded"] += 1
+                self._unlease_locked(key, candidate)
+
+        try:
+            client = self._connect(ip, user, int(port), key_path, connect_timeout)
+        except Exception:
+            with self._cond:
+                self._counters["failed"] += 1
+                self._unlease_locked(key)
+            raise
+
+        with self._cond:
+            self._leases[client] = key
+            self._counters["created"] += 1
+        return client
+
+    def release(self, client, ip, user, port=22, discard=False):
+        healthy = not discard and self._is_healthy(client)
+
+        with self._cond:
+            key = self._leases.get(client) or self._key(ip, user, port)
+            self._unlease_locked(key, client)
+            if healthy:
+                self._idle.setdefault(key, []).append((client, time.time()))
+            else:
+                self._counters["discarded"] += 1
+        if not healthy:
+            self._close(client)
+
+    @contextmanager
+    def connection(self, ip, user, port=22, key_path=None, connect_timeout=None, wait_timeout=None, keep=True):
+        """A leased client for the duration of the block; with keep=False it's closed afterwards instead of kept idle."""
+        client = self.acquire(ip, user, port, key_path, connect_timeout, wait_timeout)
+        try:
+            yield client
+        except Exception:
+            self.release(client, ip, user, port, discard=True)
+            raise
+        else:
+            self.release(client, ip, user, port, discard=not keep)
+
+    def evict_idle(self):
+        with self._cond:
+            expired = self._evict_idle_locked(time.time())
+        for client in expired:
+            self._close(client)
+
+    def close_all(self):
+        with self._cond:
+            idle = [client for clients in self._idle.values() for client, _ in clients]
+            self._idle.clear()
+        for client in idle:
+            self._close(client)
+
+    def stats(self):
+        with self._cond:
+            hosts = {}
+            for key in set(self._idle) | set(self._in_use):
+                ip, port, user, _ = key
+                host = hosts.setdefault(f"{user}@{ip}:{port}", {"in_use": 0, "idle": 0})
+                host["in_use"] += self._in_use.get(key, 0)
+                host["idle"] += len(self._idle.get(key, []))
+            return {**self._counters, "max_total": self.max_total, "hosts": hosts}
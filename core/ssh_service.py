@@ -3,7 +3,10 @@ import paramiko
 import time
 import logging
 
-KEY_PATH = os.path.expanduser("~/.ssh/id_rsa")
+from core.ssh_pool import SSHConnectionPool
+from config.settings import SSH_KEY_PATH, SSH_POOL_MAX_CONNECTIONS
+
+KEY_PATH = SSH_KEY_PATH
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -22,40 +25,34 @@ def load_private_key(key_path=KEY_PATH):
         logger.error(f"❌ Failed to load private key: {e}")
         return None
 
-def auto_copy_key(ip, user, port=22, key_path=KEY_PATH):
-    pub_key_path = key_path + ".pub"
+pool = SSHConnectionPool(KEY_PATH, load_private_key, max_total=SSH_POOL_MAX_CONNECTIONS)
+
+def auto_copy_key(ip, user, port=22, key_path=KEY_PATH, password=None):
+    from core.enrollment import enroll_host, read_public_key
+
     try:
-        with open(pub_key_path, 'r') as f:
-            pub_key = f.read().strip()
+        pub_key = read_public_key(key_path)
     except Exception as e:
         logger.error(f"❌ Failed to read public key: {e}")
         return False
 
-    cmd = (
-        f"ssh -o StrictHostKeyChecking=no -p {port} {user}@{ip} "
-        f"\"mkdir -p ~/.ssh && chmod 700 ~/.ssh && "
-        f"echo '{pub_key}' >> ~/.ssh/authorized_keys && chmod 600 ~/.ssh/authorized_keys\""
-    )
-
-    result = os.system(cmd)
-    if result == 0:
-        logger.info(f"✅ SSH key copied to {ip}")
+    result = enroll_host(ip, user, port, pub_key, password=password, auth_key_path=key_path)
+    if result["status"] != "failed":
+        logger.info(f"✅ SSH key {result['status']} on {ip}")
         return True
     else:
-        logger.error(f"❌ SSH key copy to {ip} failed.")
+        logger.error(f"❌ SSH key copy to {ip} failed: {result.get('error')}")
         return False
 
 def test_ssh_connection(ip, user, port=22, key_path=KEY_PATH, retries=3, delay=2):
-    pkey = load_private_key(key_path)
-    if not pkey:
+    if not pool.private_key(key_path):
         return False
 
     for attempt in range(1, retries + 1):
         try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(hostname=ip, port=port, username=user, pkey=pkey, timeout=3)
-            ssh.close()
+            # Bounded wait: a host whose pool slots are all leased out counts as a failed attempt, not a hang.
+            with pool.connection(ip, user, port, key_path=key_path, connect_timeout=3, wait_timeout=3):
+                pass
             logger.info(f"✅ SSH connection to {ip} successful.")
             return True
         except Exception as e:
@@ -65,27 +62,47 @@ def test_ssh_connection(ip, user, port=22, key_path=KEY_PATH, retries=3, delay=2
     logger.error(f"⛔ All SSH attempts failed for {ip}")
     return False
 
+# Everything onboarding needs from a host, printed as "key value" lines in a single round trip.
+HOST_FACTS_COMMAND = (
+    'for i in /sys/class/net/*; do echo "mac ${i##*/} $(cat "$i/address" 2>/dev/null)"; done; '
+    'echo "hostname $(hostname 2>/dev/null)"; '
+    'echo "kernel $(uname -sr 2>/dev/null)"; '
+    'echo "arch $(uname -m 2>/dev/null)"; '
+    '(. /etc/os-release 2>/dev/null && echo "os $PRETTY_NAME")'
+)
+
+def parse_host_facts(output):
+    facts = {"mac": None, "interfaces": {}}
+    for line in output.splitlines():
+        key, _, value = line.strip().partition(" ")
+        if key == "mac":
+            iface, _, mac = value.partition(" ")
+            mac = mac.strip()
+            facts["interfaces"][iface] = mac
+            if not facts["mac"] and len(mac.split(":")) == 6 and mac != "00:00:00:00:00:00":
+                facts["mac"] = mac
+        elif key in ("hostname", "kernel", "arch", "os"):
+            facts[key] = value.strip()
+    return facts
+
+def get_host_facts(ip, user, port=22, key_path=KEY_PATH, timeout=5, keep=True):
+    """
+    MAC (first non-zero interface address), interfaces, hostname, kernel, arch and OS of a host.
+
+    keep=False closes the connection afterwards rather than keeping it in the pool (unknown hosts).
+    """
+    with pool.connection(ip, user, port, key_path=key_path, connect_timeout=timeout, wait_timeout=timeout,
+                         keep=keep) as ssh:
+        stdin, stdout, _ = ssh.exec_command(HOST_FACTS_COMMAND, timeout=timeout)
+        return parse_host_facts(stdout.read().decode(errors="replace"))
+
 def get_mac_address(ip, user, port=22, key_path=KEY_PATH, timeout=5):
-    pkey = load_private_key(key_path)
-    if not pkey:
+    if not pool.private_key(key_path):
         return None
 
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
     try:
-        ssh.connect(hostname=ip, port=port, username=user, pkey=pkey, timeout=timeout)
-
-        stdin, stdout, _ = ssh.exec_command("ls /sys/class/net/")
-        interfaces = stdout.read().decode().split()
-
-        for iface in interfaces:
-            stdin, stdout, _ = ssh.exec_command(f"cat /sys/class/net/{iface}/address")
-            mac = stdout.read().decode().strip()
-            if mac and len(mac.split(":")) == 6 and mac != "00:00:00:00:00:00":
-                return mac
+        return get_host_facts(ip, user, port, key_path, timeout)["mac"]
     except Exception as e:
         logger.error(f"[⚠️ MAC ERROR] on {ip}: {e}")
-    finally:
-        ssh.close()
 
     return None
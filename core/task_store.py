@@ -0,0 +1,231 @@
+import copy
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from config.settings import TASK_STORE_BACKEND, TASK_DB_PATH
+
+SCHEDULE_FILE = Path("modules/scheduler/data/scheduled_events.json")
+
+
+class TaskStore(ABC):
+    """In-memory index of tasks by id; backends only decide how changes reach the disk."""
+
+    watch_path = None
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tasks = {}
+        self._listeners = []
+        self.version = 0
+
+    @abstractmethod
+    def _load_all(self):
+        ...
+
+    @abstractmethod
+    def _persist_upsert(self, task, tasks):
+        ...
+
+    @abstractmethod
+    def _persist_delete(self, task_id, tasks):
+        ...
+
+    @abstractmethod
+    def _persist_all(self, tasks):
+        ...
+
+    def _refresh(self):
+        pass
+
+    def _reindex(self, tasks):
+        self._tasks = {task.get("id"): task for task in tasks}
+        self.version += 1
+
+    def _changed(self):
+        self.version += 1
+        for listener in list(self._listeners):
+            try:
+                listener()
+            except Exception as e:
+                print(f"❌ [TaskStore] Listener failed: {e}")
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def current_version(self):
+        with self._lock:
+            self._refresh()
+            return self.version
+
+    def all(self):
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(list(self._tasks.values()))
+
+    def get(self, task_id):
+        with self._lock:
+            self._refresh()
+            task = self._tasks.get(task_id)
+            return copy.deepcopy(task) if task else None
+
+    def add(self, task):
+        with self._lock:
+            self._refresh()
+            self._tasks[task["id"]] = copy.deepcopy(task)
+            self._persist_upsert(self._tasks[task["id"]], self._tasks)
+            self._changed()
+
+    def update(self, task_id, updates):
+        with self._lock:
+            self._refresh()
+            task = self._tasks.get(task_id)
+            if task is None:
+                return False
+            task.update(copy.deepcopy(updates))
+            self._persist_upsert(task, self._tasks)
+            self._changed()
+            return True
+
+    def delete(self, task_id):
+        with self._lock:
+            self._refresh()
+            if self._tasks.pop(task_id, None) is None:
+                return False
+            self._persist_delete(task_id, self._tasks)
+            self._changed()
+            return True
+
+    def replace_all(self, tasks):
+        with self._lock:
+            self._tasks = {task.get("id"): copy.deepcopy(task) for task in tasks}
+            self._persist_all(self._tasks)
+            self._changed()
+
+
+class JsonTaskStore(TaskStore):
+    """Keeps the historical scheduled_events.json format, rewritten atomically and reloaded on external edits."""
+
+    def __init__(self, path=SCHEDULE_FILE):
+        super().__init__()
+        self.path = Path(path)
+        self.watch_path = self.path
+        self._signature = None
+        with self._lock:
+            self._refresh()
+
+    def _file_signature(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load_all(self):
+        if not self.path.exists():
+            return []
+        with self.path.open("r") as f:
+            return json.load(f)
+
+    def _refresh(self):
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        try:
+            tasks = self._load_all()
+        except json.JSONDecodeError as e:
+            print(f"❌ [TaskStore] {self.path} is not valid JSON ({e}) — keeping the last good copy in memory")
+            self._signature = signature
+            return
+        self._signature = signature
+        self._reindex(tasks)
+
+    def _persist_all(self, tasks):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(list(tasks.values()), f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._signature = self._file_signature()
+
+    def _persist_upsert(self, task, tasks):
+        self._persist_all(tasks)
+
+    def _persist_delete(self, task_id, tasks):
+        self._persist_all(tasks)
+
+
+class SqliteTaskStore(TaskStore):
+    """Embedded SQLite database in WAL mode; each change writes only the affected row."""
+
+    def __init__(self, path=TASK_DB_PATH, import_from=SCHEDULE_FILE):
+        super().__init__()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " id TEXT PRIMARY KEY, position REAL NOT NULL, data TEXT NOT NULL)"
+        )
+
+        with self._lock:
+            tasks = self._load_all()
+            if not tasks and import_from and Path(import_from).exists():
+                try:
+                    tasks = JsonTaskStore(import_from).all()
+                except Exception as e:
+                    print(f"⚠️ [TaskStore] Could not import {import_from}: {e}")
+                    tasks = []
+                if tasks:
+                    self._tasks = {task.get("id"): task for task in tasks}
+                    self._persist_all(self._tasks)
+                    print(f"📦 [TaskStore] Imported {len(tasks)} task(s) from {import_from}")
+            self._reindex(tasks)
+
+    def _load_all(self):
+        rows = self._conn.execute("SELECT data FROM tasks ORDER BY position").fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def _persist_upsert(self, task, tasks):
+        self._conn.execute(
+            "INSERT INTO tasks (id, position, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+            (task["id"], time.time(), json.dumps(task)),
+        )
+
+    def _persist_delete(self, task_id, tasks):
+        self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def _persist_all(self, tasks):
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM tasks")
+            self._conn.executemany(
+                "INSERT INTO tasks (id, position, data) VALUES (?, ?, ?)",
+                [(task["id"], index, json.dumps(task)) for index, task in enumerate(tasks.values())],
+            )
+
+
+def create_task_store(backend=TASK_STORE_BACKEND):
+    if backend == "sqlite":
+        return SqliteTaskStore()
+    if backend == "json":
+        return JsonTaskStore()
+    raise ValueError(f"Unknown task store backend: {backend}")
+
+
+store = create_task_store()
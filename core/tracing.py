@@ -0,0 +1,132 @@
+import itertools
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+
+MAX_SPANS = 50000
+
+
+class Tracer:
+    """
+    Bounded in-memory span buffer; a trace is one run (its id is the run id).
+
+    Spans are recorded after the fact from timestamps the caller already has, so tracing costs a
+    dict and a deque append per span and can stay on in production. The oldest spans are dropped
+    once the buffer is full.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=max_spans)
+        self._ids = itertools.count(1)
+        self._prefix = f"{os.getpid():x}"
+        self._forward = None
+        self.recorded = 0
+
+    def new_span_id(self):
+        return f"{self._prefix}.{next(self._ids)}"
+
+    def forward_to(self, sink):
+        """Hand spans to sink(span) instead of buffering them (used by executor worker processes)."""
+        self._forward = sink
+
+    def record(self, trace_id, name, start, end, parent_id=None, span_id=None, **attrs):
+        if not trace_id:
+            return None
+        span = {
+            "trace_id": trace_id,
+            "span_id": span_id or self.new_span_id(),
+            "parent_id": parent_id,
+            "name": name,
+            "start": start,
+            "duration": max(end - start, 0),
+            "attrs": attrs,
+        }
+        self.add(span)
+        return span["span_id"]
+
+    def add(self, span):
+        if self._forward is not None:
+            self._forward(span)
+            return
+        with self._lock:
+            self._spans.append(span)
+            self.recorded += 1
+
+    def spans(self, trace_id=None, task_id=None):
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id is not None:
+            spans = [span for span in spans if span["trace_id"] == trace_id]
+        if task_id is not None:
+            traces = {span["trace_id"] for span in spans if span["attrs"].get("task_id") == task_id}
+            spans = [span for span in spans if span["trace_id"] in traces]
+        return spans
+
+    def traces(self, task_id=None, limit=50):
+        """Newest-first summaries of the traces still in the buffer."""
+        summaries = OrderedDict()
+        for span in self.spans(task_id=task_id):
+            summary = summaries.get(span["trace_id"])
+            if summary is None:
+                summary = summaries[span["trace_id"]] = {
+                    "trace_id": span["trace_id"], "name": None, "task_id": None,
+                    "start": span["start"], "end": span["start"] + span["duration"], "spans": 0, "hosts": set(),
+                }
+            summary["spans"] += 1
+            summary["start"] = min(summary["start"], span["start"])
+            summary["end"] = max(summary["end"], span["start"] + span["duration"])
+            if span["parent_id"] is None:
+                summary["name"] = span["name"]
+                summary["task_id"] = span["attrs"].get("task_id")
+            if span["attrs"].get("ip"):
+                summary["hosts"].add(span["attrs"]["ip"])
+
+        result = []
+        for summary in sorted(summaries.values(), key=lambda s: s["start"], reverse=True)[:limit]:
+            summary["duration"] = round(summary.pop("end") - summary["start"], 6)
+            summary["hosts"] = len(summary["hosts"])
+            result.append(summary)
+        return result
+
+    def chrome_trace(self, trace_id=None, task_id=None):
+        """Spans as a Chrome trace (chrome://tracing, Perfetto): one process per trace, one thread row per host."""
+        events = []
+        pids = {}
+        tids = {}
+        for span in sorted(self.spans(trace_id, task_id), key=lambda s: s["start"]):
+            pid = pids.get(span["trace_id"])
+            if pid is None:
+                pid = pids[span["trace_id"]] = len(pids) + 1
+                events.append({"ph": "M", "name": "process_name", "pid": pid, "tid": 0,
+                               "args": {"name": f"trace {span['trace_id']}"}})
+            row = span["attrs"].get("ip") or "run"
+            tid = tids.get((pid, row))
+            if tid is None:
+                tid = tids[(pid, row)] = len([key for key in tids if key[0] == pid])
+                events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": row}})
+            events.append({
+                "ph": "X",
+                "name": span["name"],
+                "cat": "hubiwave",
+                "pid": pid,
+                "tid": tid,
+                "ts": round(span["start"] * 1e6),
+                "dur": round(span["duration"] * 1e6),
+                "args": dict(span["attrs"], span_id=span["span_id"], parent_id=span["parent_id"]),
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path, trace_id=None, task_id=None):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(trace_id, task_id), f)
+        return path
+
+    def stats(self):
+        with self._lock:
+            return {"buffered": len(self._spans), "max_spans": self.max_spans, "recorded": self.recorded}
+
+
+tracer = Tracer()
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import shlex
+import threading
+import time
+
+
+class ScriptUploadCache:
+    """Uploads scripts by content hash and skips the SFTP transfer when the host already has the same bytes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}
+        self._stats = {"uploads": 0, "skipped": 0, "bytes_uploaded": 0, "bytes_saved": 0, "upload_seconds": 0.0}
+
+    def local_digest(self, local_path):
+        stat = os.stat(local_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._local.get(local_path)
+        if cached and cached[0] == signature:
+            return cached[1], stat.st_size
+
+        sha = hashlib.sha256()
+        with open(local_path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        with self._lock:
+            self._local[local_path] = (signature, digest)
+        return digest, stat.st_size
+
+    @staticmethod
+    def remote_digest(ssh, remote_path):
+        quoted = shlex.quote(remote_path)
+        stdin, stdout, stderr = ssh.exec_command(f"[ -x {quoted} ] && sha256sum {quoted}")
+        output = stdout.read().decode().strip()
+        return output.split()[0] if output else None
+
+    def ensure(self, ssh, open_sftp, local_path, remote_path):
+        """
+        Make remote_path hold the bytes of local_path, uploading only if the digests differ.
+
+        open_sftp() returns a context manager yielding an SFTP client; it is only called when an
+        upload is needed, so an up-to-date host costs one exec round trip and no SFTP channel.
+        """
+        digest, size = self.local_digest(local_path)
+
+        if self.remote_digest(ssh, remote_path) == digest:
+            with self._lock:
+                self._stats["skipped"] += 1
+                self._stats["bytes_saved"] += size
+            return {"uploaded": False, "bytes": size, "seconds": 0.0, "sha256": digest}
+
+        started = time.time()
+        with open_sftp() as sftp:
+            sftp.put(local_path, remote_path)
+            sftp.chmod(remote_path, 0o755)
+        elapsed = time.time() - started
+
+        with self._lock:
+            self._stats["uploads"] += 1
+            self._stats["bytes_uploaded"] += size
+            self._stats["upload_seconds"] += elapsed
+        return {"uploaded": True, "bytes": size, "seconds": round(elapsed, 3), "sha256": digest}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, upload_seconds=round(self._stats["upload_seconds"], 3))
+
+
+upload_cache = ScriptUploadCache()
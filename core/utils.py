@@ -1,10 +1,4 @@
-import json
-import os
-
-HOSTS_FILE = "modules/hosts/data/hosts.json"
+from core.host_registry import registry
 
 def load_hosts():
-    if os.path.exists(HOSTS_FILE):
-        with open(HOSTS_FILE, "r") as f:
-            return json.load(f)
-    return []
+    return registry.all()
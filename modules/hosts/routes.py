@@ -1,12 +1,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 import json, os
 from datetime import datetime
-from core.ssh_service import ensure_ssh_key, auto_copy_key, test_ssh_connection, get_mac_address
+from core.ssh_service import ensure_ssh_key, auto_copy_key, get_mac_address
+from core.host_health import prober
+from core.host_registry import registry, HOSTS_FILE
+from core.discovery import discovery, expand_targets, add_pending_host as save_pending_host, pending_lock, PENDING_FILE
+from core.enrollment import enroll_hosts
 
 hosts_bp = Blueprint("hosts", __name__, template_folder="templates")
 
-HOSTS_FILE = "modules/hosts/data/hosts.json"
-PENDING_FILE = "modules/hosts/data/pending_hosts.json"
 DEFAULT_KEY = os.path.expanduser("~/.ssh/id_rsa")
 
 def load_json(path):
@@ -18,23 +20,19 @@ def load_json(path):
 def save_json(path, data):
     with open(path, "w") as f:
         json.dump(data, f, indent=2)
+    if path == HOSTS_FILE:
+        registry.invalidate()
 
 @hosts_bp.route("/hosts")
 def list_hosts():
-    hosts = load_json(HOSTS_FILE)
-    for host in hosts:
-        host["connected"] = test_ssh_connection(
-            host["ip"], host["user"], host.get("port", 22), host.get("key_path", DEFAULT_KEY)
-        )
+    hosts = registry.all()
+    prober.annotate(hosts)
     return render_template("hosts/list.html", hosts=hosts)
 
 @hosts_bp.route("/pending")
 def pending_hosts():
     pending = load_json(PENDING_FILE)
-    for host in pending:
-        host["connected"] = test_ssh_connection(
-            host["ip"], host["user"], host.get("port", 22), host.get("key_path", DEFAULT_KEY)
-        )
+    prober.annotate(pending)
     return render_template("hosts/pending.html", pending_hosts=pending)
 
 @hosts_bp.route("/add_pending", methods=["POST"])
@@ -46,7 +44,7 @@ def add_pending_host():
         port = int(data.get("port", 22))
 
         ensure_ssh_key()
-        auto_copy_key(ip, user, port, DEFAULT_KEY)
+        auto_copy_key(ip, user, port, DEFAULT_KEY, password=data.get("password") or None)
         mac = get_mac_address(ip, user, port, DEFAULT_KEY)
 
         if not mac:
@@ -61,36 +59,75 @@ def add_pending_host():
             "added_at": datetime.now().isoformat()
         }
 
-        hosts = load_json(HOSTS_FILE)
-        pending = load_json(PENDING_FILE)
+        status = save_pending_host(new_host)
+        return jsonify({"status": status, "ip": ip, "mac": mac})
 
-        if any(h["id"] == mac for h in hosts + pending):
-            return jsonify({"status": "exists", "ip": ip, "mac": mac})
+    except Exception as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
 
-        pending.append(new_host)
-        save_json(PENDING_FILE, pending)
-        return jsonify({"status": "added", "ip": ip, "mac": mac})
+@hosts_bp.route("/discover", methods=["POST"])
+def start_discovery():
+    data = request.get_json() or {}
+    if not data.get("targets") or not data.get("user"):
+        return jsonify({"status": "error", "error": "targets and user are required"}), 400
+    try:
+        job = discovery.start(
+            data["targets"],
+            data["user"],
+            port=int(data.get("port", 22)),
+            key_path=data.get("key_path") or DEFAULT_KEY,
+            timeout=float(data.get("timeout", 1.0)),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    return jsonify({"status": "started", "job_id": job.job_id, "total": len(job.ips)})
+
+@hosts_bp.route("/discover/<job_id>")
+def discovery_progress(job_id):
+    job = discovery.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "error": "Unknown discovery job"}), 404
+    return jsonify(job.progress(since=request.args.get("since", 0, type=int)))
+
+@hosts_bp.route("/enroll", methods=["POST"])
+def enroll():
+    """Install our public key on many hosts at once: {"hosts": [{ip, user, port}]} or {"targets", "user", "port"}."""
+    data = request.get_json() or {}
+    try:
+        hosts = data.get("hosts") or [
+            {"ip": ip, "user": data.get("user"), "port": int(data.get("port", 22))}
+            for ip in expand_targets(data.get("targets", ""))
+        ]
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    if not hosts or any(not host.get("ip") or not host.get("user") for host in hosts):
+        return jsonify({"status": "error", "error": "every host needs an ip and a user"}), 400
 
-    except Exception as e:
+    ensure_ssh_key()
+    try:
+        report = enroll_hosts(hosts, password=data.get("password") or None, key_path=DEFAULT_KEY)
+    except (OSError, ValueError) as e:
         return jsonify({"status": "error", "error": str(e)}), 400
+    return jsonify({"status": "done", **report})
 
 @hosts_bp.route("/validate_host", methods=["POST"])
 def validate_host():
     mac_id = request.form.get("id")
-    pending = load_json(PENDING_FILE)
-    hosts = load_json(HOSTS_FILE)
+    with pending_lock:
+        pending = load_json(PENDING_FILE)
+        hosts = load_json(HOSTS_FILE)
 
-    match = next((h for h in pending if h["id"] == mac_id), None)
-    if not match:
-        flash("❌ Not found.")
-        return redirect(url_for("hosts.pending_hosts"))
+        match = next((h for h in pending if h["id"] == mac_id), None)
+        if not match:
+            flash("❌ Not found.")
+            return redirect(url_for("hosts.pending_hosts"))
 
-    if not any(h["id"] == mac_id for h in hosts):
-        hosts.append(match)
-        save_json(HOSTS_FILE, hosts)
+        if not any(h["id"] == mac_id for h in hosts):
+            hosts.append(match)
+            save_json(HOSTS_FILE, hosts)
 
-    pending = [h for h in pending if h["id"] != mac_id]
-    save_json(PENDING_FILE, pending)
+        pending = [h for h in pending if h["id"] != mac_id]
+        save_json(PENDING_FILE, pending)
 
     flash("✅ Machine validated.")
     return redirect(url_for("hosts.pending_hosts"))
@@ -100,21 +137,19 @@ def delete_host():
     mac_id = request.form.get("id")
     modified = False
 
-    for path in [HOSTS_FILE, PENDING_FILE]:
-        data = load_json(path)
-        new_data = [h for h in data if h["id"] != mac_id]
-        if len(new_data) != len(data):
-            save_json(path, new_data)
-            modified = True
+    with pending_lock:
+        for path in [HOSTS_FILE, PENDING_FILE]:
+            data = load_json(path)
+            new_data = [h for h in data if h["id"] != mac_id]
+            if len(new_data) != len(data):
+                save_json(path, new_data)
+                modified = True
 
     flash("🗑 Deleted." if modified else "⚠️ Not found.")
     return redirect(request.referrer or url_for("hosts.list_hosts"))
 
 @hosts_bp.route("/settings_data")
 def settings_data():
-    hosts = load_json(HOSTS_FILE)
-    for host in hosts:
-        host["connected"] = test_ssh_connection(
-            host["ip"], host["user"], host.get("port", 22), host.get("key_path", DEFAULT_KEY)
-        )
+    hosts = registry.all()
+    prober.annotate(hosts)
     return jsonify(hosts)
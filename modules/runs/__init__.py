@@ -0,0 +1,3 @@
+from flask import Blueprint
+runs_bp = Blueprint("runs", __name__, template_folder="templates")
+from . import routes
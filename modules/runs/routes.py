@@ -0,0 +1,94 @@
+import json
+from flask import Response, render_template, request, jsonify, abort, stream_with_context
+from . import runs_bp
+from core.output_stream import runs
+from core.tracing import tracer
+
+KEEPALIVE_SECONDS = 15
+
+
+@runs_bp.route("/runs")
+def list_runs():
+    return render_template("runs/list.html", runs=runs.list())
+
+
+@runs_bp.route("/api/runs")
+def runs_data():
+    return jsonify(runs.list())
+
+
+@runs_bp.route("/runs/<run_id>")
+def view_run(run_id):
+    run = runs.get(run_id)
+    if run is None:
+        abort(404)
+    return render_template("runs/stream.html", run=run.summary())
+
+
+@runs_bp.route("/runs/<run_id>/stream")
+def stream_run(run_id):
+    run = runs.get(run_id)
+    if run is None:
+        abort(404)
+
+    last_seq = request.headers.get("Last-Event-ID", type=int) or request.args.get("since", 0, type=int)
+
+    def events():
+        seq = last_seq
+        while True:
+            chunks, finished = run.read_since(seq, timeout=KEEPALIVE_SECONDS)
+            for chunk in chunks:
+                seq = chunk["seq"]
+                yield f"id: {seq}\nevent: {chunk['stream']}\ndata: {json.dumps(chunk)}\n\n"
+            if finished and not chunks:
+                yield f"event: end\ndata: {json.dumps(run.summary())}\n\n"
+                return
+            if not chunks:
+                yield ": keepalive\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@runs_bp.route("/traces")
+def list_traces():
+    task_id = request.args.get("task_id") or None
+    return render_template("runs/traces.html", traces=tracer.traces(task_id), task_id=task_id, stats=tracer.stats())
+
+
+@runs_bp.route("/traces/<trace_id>")
+def view_trace(trace_id):
+    spans = tracer.spans(trace_id)
+    if not spans:
+        abort(404)
+    # Run-level span first, then each host's spans together in time order.
+    spans.sort(key=lambda span: (span["attrs"].get("ip") or "", span["start"]))
+    origin = min(span["start"] for span in spans)
+    total = max(max(span["start"] + span["duration"] for span in spans) - origin, 1e-6)
+    return render_template("runs/trace.html", trace_id=trace_id, spans=spans, origin=origin, total=total)
+
+
+@runs_bp.route("/api/traces")
+def traces_data():
+    return jsonify(tracer.traces(request.args.get("task_id") or None, limit=request.args.get("limit", 50, type=int)))
+
+
+@runs_bp.route("/api/traces/<trace_id>")
+def trace_data(trace_id):
+    return jsonify(tracer.spans(trace_id))
+
+
+@runs_bp.route("/api/traces/export")
+def export_traces():
+    """Chrome trace JSON for one trace (?trace_id=) or every buffered trace of a task (?task_id=)."""
+    trace_id = request.args.get("trace_id") or None
+    task_id = request.args.get("task_id") or None
+    name = trace_id or task_id or "all"
+    return Response(
+        json.dumps(tracer.chrome_trace(trace_id, task_id)),
+        mimetype="application/json",
+        headers={"Content-Disposition": f'attachment; filename="trace-{name}.json"'},
+    )
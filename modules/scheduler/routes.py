@@ -1,13 +1,12 @@
 from flask import render_template, request, redirect, url_for
 from . import scheduler_bp
 import os
-import json
-from datetime import datetime
 from core import scheduler_service as sched
 from modules.scheduler.services import create_task_from_form  # Make sure this import path is correct
+from core.host_registry import registry
+from core.execution_plan import wave_count
 
 # Paths
-HOSTS_FILE = "modules/hosts/data/hosts.json"
 SCRIPTS_DIR = "modules/scripts/scripts_drive"
 
 @scheduler_bp.route("/scheduler", methods=["GET", "POST"])
@@ -36,7 +35,8 @@ def scheduler():
                 new_task["execution_spacing"],
                 new_task["cycle_every"],
                 new_task["cycle_unit"],
-                new_task["execution_mode"]
+                new_task["execution_mode"],
+                waves=wave_count(new_task)
             )
             if metadata:
                 new_task.update(metadata)
@@ -60,10 +60,7 @@ def scheduler():
     if os.path.isdir(SCRIPTS_DIR):
         scripts = [f for f in os.listdir(SCRIPTS_DIR) if f.endswith((".sh", ".py"))]
 
-    hosts = []
-    if os.path.exists(HOSTS_FILE):
-        with open(HOSTS_FILE, "r") as f:
-            hosts = json.load(f)
+    hosts = registry.all()
 
     return render_template("scheduler/scheduler.html",
                            edit_task=None,
@@ -2,6 +2,7 @@ from core.scheduler_service import (
     load_tasks, save_task, generate_task_id,
     calculate_schedule_metadata
 )
+from core.execution_plan import wave_size_for
 
 def create_task_from_form(form_data):
     """Convert Flask form data into a task dictionary ready for saving."""    
@@ -27,6 +28,11 @@ def create_task_from_form(form_data):
         "active": "active_checkbox" in form_data
     }
 
+    if task["execution_mode"] == "rolling":
+        task["wave_size"] = (form_data.get("wave_size") or "25%").replace(" ", "")
+        task["wave_failure_threshold"] = int(form_data.get("wave_failure_threshold") or 100)
+        wave_size_for(task["wave_size"], len(task["machines"]))  # raises ValueError on e.g. "ten"
+
     if task_type == "command":
         task["command"] = form_data.get("command_text")
     elif task_type == "script":
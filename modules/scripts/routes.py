@@ -1,18 +1,19 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 import os
-from concurrent.futures import ThreadPoolExecutor
 import datetime
 import json
+import threading
 
-from core.executor import run_task  # Real SSH execution function
+from core.executor import execute_on_hosts, log_execution  # Real SSH execution
+from core.dispatch import MANUAL
+from core.output_stream import runs
+from core.host_registry import registry
 
 scripts_bp = Blueprint("scripts", __name__, template_folder="templates")
 
 # Directories & files
 SCRIPTS_DIR = "modules/scripts/scripts_drive"
-HOSTS_FILE = "modules/hosts/data/hosts.json"
 METADATA_FILE = "modules/scripts/data/metadata.json"
-LOG_FILE = "logs/executions.log"
 ALLOWED_EXTENSIONS = {".sh", ".py"}
 
 
@@ -28,17 +29,7 @@ def get_script_metadata():
 
 
 def get_registered_hosts():
-    if os.path.exists(HOSTS_FILE):
-        with open(HOSTS_FILE) as f:
-            return json.load(f)
-    return []
-
-
-def log_execution(entry: str):
-    """Append a log line to logs/executions.log."""
-    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-    with open(LOG_FILE, "a") as f:
-        f.write(entry + "\n")
+    return registry.all()
 
 
 @scripts_bp.route("/scripts")
@@ -105,40 +96,34 @@ def run_script(filename):
         flash("❗ No target machines selected.")
         return redirect(url_for("scripts.list_scripts"))
 
-    all_hosts = get_registered_hosts()
-    host_map = {h["ip"]: h for h in all_hosts}
-
-    def run_for_ip(ip):
-        host = host_map.get(ip)
-        if not host:
-            flash(f"⚠️ Machine {ip} not found in hosts.json")
-            return
-
-        # Force detach to False for scripts
-        task = {
-            "id": f"manual-{datetime.datetime.now().timestamp()}",
-            "type": "script",
-            "filename": filename,
-            "remote_name": filename,
-            "detach": False,
-            "machines": [ip],
-            "user": host.get("user", "root"),
-            "port": host.get("port", 22)
-        }
-
-        print(f"[DEBUG] Running task for: {ip}")
-        print(json.dumps(task, indent=2))
-
+    # Force detach to False for scripts
+    task = {
+        "id": f"manual-{datetime.datetime.now().timestamp()}",
+        "name": f"Manual run: {filename}",
+        "type": "script",
+        "filename": filename,
+        "remote_name": filename,
+        "detach": False,
+        "machines": selected_ips,
+    }
+
+    # The run (and so its trace) carries the task id the host spans and execution records use.
+    run = runs.create(task["id"], task["name"])
+
+    def finished(ip, result):
+        run.host_finished(ip, result["status"], result.get("exit_code"))
+        log_execution(task, result, execution_index=1)
+        if result["status"] not in ("success", "detached"):
+            print(f"❌ {filename} failed on {ip}: {result.get('error') or result['status']}")
+
+    def execute():
         try:
-            run_task(task)
-            flash(f"✅ {filename} executed on {ip}")
-            log_execution(f"{datetime.datetime.now().isoformat()} | {ip} | {filename} | SYNC | SUCCESS")
-        except Exception as e:
-            flash(f"❌ Failed on {ip}: {e}")
-            log_execution(f"{datetime.datetime.now().isoformat()} | {ip} | {filename} | ERROR | {str(e)}")
-
-    # Run in parallel for each selected machine
-    with ThreadPoolExecutor(max_workers=len(selected_ips)) as executor:
-        executor.map(run_for_ip, selected_ips)
-
-    return redirect(url_for("scripts.list_scripts"))
+            # Someone is waiting on this page: queue ahead of scheduled work, within the global and per-host caps
+            execute_on_hosts(task, selected_ips, run, on_result=finished, priority=MANUAL)
+        finally:
+            run.close()
+
+    # The run page streams the output live and shows each machine's outcome as it finishes.
+    threading.Thread(target=execute, daemon=True, name=f"manual-{run.run_id}").start()
+    flash(f"📡 Running {filename} on {len(selected_ips)} machine(s)")
+    return redirect(url_for("runs.view_run", run_id=run.run_id))